@@ -1,65 +1,72 @@
-from fastapi import FastAPI
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import importlib
+import inspect
+import os
+from typing import Optional
 
 from models.schemas import SearchFilters, SearchQuery, RelevanceRequest
-from utils.kanoon_api import fetch_case_by_docid, fetch_cases
-from utils.sambonva_utils import extract_keywords, hierarchical_relevance, summarize_case, explain_relevance
-from utils.db import get_meta, init_db, save_meta, save_summary
+from utils.kanoon_api import close_http_client, fetch_case_by_docid, fetch_cases, fetch_cases_html, project_case, slice_text, get_http_client, clean_html_doc
+from utils.sambonva_utils import SAMBA_API_KEY, explain_relevance, get_client, llm_wait_seconds
+from utils.admission import admission
+from utils.keyword_extractor import extract_search_keywords, load_phrases_from_db
+from utils.db import close_db, get_citation_counts, get_meta, init_db, save_meta, save_query_rewrite, save_summary
+from utils.citations import index_case_citations
+from utils.chunk_store import relevance_for_case, summarize_document
+from utils.response_utils import json_response
 from routes import case_routes, meta
 from routes.user_routes import router as user_router
 from routes.case_routes import router as case_routes 
+from routes.citation_routes import router as citation_router
+
+
+async def _warm_step(name: str, run, tolerated: bool = False) -> bool:
+    try:
+        result = run()
+        if inspect.isawaitable(result):
+            await result
+        return True
+    except Exception as e:
+        print(f"[API] Warm-up step '{name}' failed{' (tolerated)' if tolerated else ''}: {e}")
+        return tolerated
+
+
+async def warm_up(app: FastAPI):
+    # Heavy imports and client construction, off the critical path of the first request.
+    # Steps are independent so one failure doesn't skip the rest; /readyz only
+    # reports warm once every step succeeded or its failure is tolerated.
+    results = [
+        # Without a key the LLM endpoints answer with a fixed message, so no client is needed.
+        await _warm_step("llm client", lambda: asyncio.to_thread(get_client), tolerated=not SAMBA_API_KEY),
+        await _warm_step("html cleaner", lambda: asyncio.to_thread(clean_html_doc, "")),
+        await _warm_step("passlib", lambda: asyncio.to_thread(importlib.import_module, "passlib.hash")),
+        # The seed phrases still work without the learned ones.
+        await _warm_step("phrase dictionary", load_phrases_from_db, tolerated=True),
+        await _warm_step("http client", get_http_client),
+    ]
+    app.state.warm = all(results)
+    print(f"[API] Warm-up {'complete' if app.state.warm else 'incomplete; /readyz stays 503'}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
+    app.state.warm = False
     await init_db()
+    warm_task = asyncio.create_task(warm_up(app))
     yield
+    warm_task.cancel()
+    await close_http_client()
+    await close_db()
 
-app = FastAPI(lifespan=lifespan)
-
-origins = [
-    "https://maamla-legal-hai-ui.onrender.com",
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,           
-    allow_credentials=True,          
-    allow_methods=["*"],             
-    allow_headers=["*"],             
-)
-
-# Include sub-routers
-app.include_router(meta.router)
-app.include_router(user_router)
-app.include_router(case_routes)
-
-# Routes
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-
-from models.schemas import SearchFilters, SearchQuery, RelevanceRequest
-from utils.kanoon_api import fetch_case_by_docid, fetch_cases
-from utils.sambonva_utils import extract_keywords, hierarchical_relevance, summarize_case, explain_relevance
-from utils.db import get_meta, init_db, save_meta, save_summary
-from routes import case_routes, meta
-from routes.user_routes import router as user_router
-from routes.case_routes import router as case_routes 
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup logic
-    await init_db()
-    yield
+SEARCH_SCRAPE_FALLBACK = os.getenv("SEARCH_SCRAPE_FALLBACK", "true").lower() == "true"
 
 app = FastAPI(lifespan=lifespan)
 
 origins = [
-    "https://maamla-legal-hai-ui.onrender.com"
+    "https://maamla-legal-hai-ui.onrender.com",
 ]
 
 app.add_middleware(
@@ -74,12 +81,21 @@ app.add_middleware(
 app.include_router(meta.router)
 app.include_router(user_router)
 app.include_router(case_routes)
+app.include_router(citation_router)
 
 # Routes
 @app.post("/search")
 async def search_cases(search_query: SearchQuery):
     print("Search endpoint")
-    keywords = await extract_keywords(search_query.query)
+    async with admission.admit("search"):
+        return await _search(search_query)
+
+
+async def _search(search_query: SearchQuery):
+    # Keywords come from the local extractor; the LLM is only a fallback for
+    # low-confidence queries and is skipped when its budget is saturated.
+    keywords, keyword_source, degraded = await extract_search_keywords(search_query.query)
+    print(f"[API] Keywords ({keyword_source}): {keywords}")
     modified_query = " ".join(keywords) if keywords else search_query.query
 
     f = search_query.filters or SearchFilters()
@@ -100,6 +116,12 @@ async def search_cases(search_query: SearchQuery):
     if f.maxpages is not None: params["maxpages"] = str(f.maxpages)
 
     result = await fetch_cases(params)
+    if "error" in result and SEARCH_SCRAPE_FALLBACK:
+        print(f"[API] Search API failed ({result['error']}), falling back to HTML scrape")
+        scraped = await fetch_cases_html(params)
+        if "error" not in scraped:
+            result = scraped
+    await _annotate_citations(result, search_query.rank_by_citations)
      # Extract total result count
     found_text = result.get("found", "")
     total_count = 0
@@ -109,11 +131,12 @@ async def search_cases(search_query: SearchQuery):
         except ValueError:
             total_count = 0
 
-    for case in result.get("cases", []):
-        docid = case.get("docid")
-        if docid:
-            save_meta(docid, search_query.query, modified_query)
-            print(f"[API] Meta saved during search for docid={docid}")
+    if keyword_source == "llm" and keywords:
+        # Pairs feed the local extractor's phrase dictionary on the next start.
+        try:
+            await save_query_rewrite(search_query.query, modified_query)
+        except Exception as e:
+            print(f"[API] Could not record query rewrite: {e}")
 
     page_size = 10  # default
     pagination_info = {
@@ -126,84 +149,82 @@ async def search_cases(search_query: SearchQuery):
 
     return {
         "pagination": pagination_info,
+        "degraded": degraded,
+        "keyword_source": keyword_source,
         "data": result
     }
 
 
-@app.post("/doc/{docid}")
-async def get_case_by_docid(docid: str):
-    return await fetch_case_by_docid(docid)
-
-@app.post("/summarize/{docid}")
-async def summarize_doc(docid: str):
-    meta_data = await get_meta(docid)
-    if meta_data and meta_data.get("summary"):
-        return {"summary": meta_data["summary"]}
-
-    doc = await fetch_case_by_docid(docid)
-    case_text = doc.get("text") or doc.get("clean_doc", "")
-    # Use up to 128k tokens (approx 100k words)
-    if len(case_text) > 100000:
-        case_text = case_text[:100000]
-    summary = await summarize_case(case_text)
-    await save_summary(docid, summary)
-    return {"summary": summary}
-
-@app.post("/relevance/")
-async def case_relevance(request: RelevanceRequest):
-    meta_data = await get_meta(request.docid)
-    if meta_data and meta_data.get("summary"):
-        summary = meta_data["summary"]
-    else:
-        case = await fetch_case_by_docid(request.docid)
-        case_text = case.get("text") or case.get("clean_doc", "")
-        if len(case_text) > 100000:
-            case_text = case_text[:100000]
-        summary = await summarize_case(case_text)
-        await save_summary(request.docid, summary)
-
-    if not meta_data or not meta_data.get("query"):
-        await save_meta(request.docid, request.query, request.modified_query)
-
-    explanation = await hierarchical_relevance(request.query, summary)
-    return {"explanation": explanation}
-
+async def _annotate_citations(result: dict, rank: bool):
+    # Local citation graph as a ranking signal; never let it break search.
+    docs = result.get("docs") or []
+    docids = [str(d["tid"]) for d in docs if d.get("tid")]
+    if not docids:
+        return
+    try:
+        counts = await get_citation_counts(docids)
+    except Exception as e:
+        print(f"[API] Citation counts unavailable: {e}")
+        return
+    for d in docs:
+        c = counts.get(str(d.get("tid")), {})
+        d["local_cited_by"] = c.get("cited_by", 0)
+        d["local_cited_by_within"] = c.get("cited_by_within", 0)
+    if rank:
+        docs.sort(key=lambda d: (d["local_cited_by_within"], d["local_cited_by"]), reverse=True)
 
 
 @app.post("/doc/{docid}")
-async def get_case_by_docid(docid: str):
-    return await fetch_case_by_docid(docid)
+async def get_case_by_docid(
+    docid: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    fields: Optional[str] = Query(None, description="Comma-separated fields or presets: meta, clean, raw"),
+    offset: int = Query(0, ge=0, description="Character offset into clean_doc"),
+    limit: Optional[int] = Query(None, ge=1, description="Max characters of clean_doc to return"),
+):
+    full_doc = await fetch_case_by_docid(docid)
+    # The indexer runs after the response and needs the whole text, never the sliced page.
+    background_tasks.add_task(index_case_citations, docid, full_doc)
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    # project_case returns its input when no fields are given; copy before editing.
+    doc = dict(project_case(full_doc, requested))
+
+    # Range pagination applies to the cleaned text only; raw HTML can't be cut safely.
+    if "clean_doc" in doc and (offset or limit):
+        page = slice_text(doc["clean_doc"], offset, limit)
+        doc["clean_doc"] = page.pop("text")
+        doc["clean_doc_range"] = page
+
+    return await json_response(request, doc)
 
 @app.post("/summarize/{docid}")
-async def summarize_doc(docid: str):
+async def summarize_doc(docid: str, background_tasks: BackgroundTasks):
     meta_data = await get_meta(docid)
     if meta_data and meta_data.get("summary"):
         return {"summary": meta_data["summary"]}
 
-    doc = await fetch_case_by_docid(docid)
-    case_text = doc.get("text") or doc.get("clean_doc", "")
-    # Use up to 128k tokens (approx 100k words)
-    if len(case_text) > 100000:
-        case_text = case_text[:100000]
-    summary = await summarize_case(case_text)
-    await save_summary(docid, summary)
+    async with admission.admit("summarize", extra_wait=llm_wait_seconds()):
+        doc = await fetch_case_by_docid(docid)
+        if "error" in doc:
+            raise HTTPException(status_code=502, detail=f"Could not fetch case {docid}: {doc['error']}")
+        background_tasks.add_task(index_case_citations, docid, doc)
+        case_text = doc.get("text") or doc.get("clean_doc", "")
+        # Full text; chunk summaries are stored and reused by relevance.
+        summary = await summarize_document(docid, case_text)
+        await save_summary(docid, summary)
     return {"summary": summary}
 
 @app.post("/relevance/")
 async def case_relevance(request: RelevanceRequest):
-    meta_data = await get_meta(request.docid)
-    if meta_data and meta_data.get("summary"):
-        summary = meta_data["summary"]
-    else:
-        case = await fetch_case_by_docid(request.docid)
-        case_text = case.get("text") or case.get("clean_doc", "")
-        if len(case_text) > 100000:
-            case_text = case_text[:100000]
-        summary = await summarize_case(case_text)
-        await save_summary(request.docid, summary)
-
-    if not meta_data or not meta_data.get("query"):
-        await save_meta(request.docid, request.query, request.modified_query)
-
-    explanation = await hierarchical_relevance(request.query, summary)
+    async with admission.admit("relevance", extra_wait=llm_wait_seconds()):
+        meta_data = await get_meta(request.docid)
+        cached_summary = (meta_data.get("summary") if meta_data else None) or request.summary
+
+        explanation, new_summary = await relevance_for_case(request.docid, request.query, cached_summary)
+        if new_summary:
+            await save_summary(request.docid, new_summary)
+
+        if not meta_data or not meta_data.get("query"):
+            await save_meta(request.docid, request.query, request.modified_query)
     return {"explanation": explanation}
@@ -19,11 +19,18 @@ class SearchQuery(BaseModel):
     query: str
     page: Optional[int] = 0  
     filters: Optional[SearchFilters] = None
+    rank_by_citations: Optional[bool] = False
 
 
 class RelevanceRequest(BaseModel):
+    docid: str
     query: str
-    summary: str  # Pass summary directly from UI
+    modified_query: Optional[str] = None
+    summary: Optional[str] = None  # Pass summary directly from UI; used when none is stored
+
+
+class CitationRankRequest(BaseModel):
+    docids: List[str]
 
 
 class UserSignup(BaseModel):
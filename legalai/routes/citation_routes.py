@@ -0,0 +1,41 @@
+from fastapi import APIRouter, BackgroundTasks, Query
+from models.schemas import CitationRankRequest
+from utils.citations import extract_citations, index_case_citations
+from utils.db import get_cites, get_cited_by, get_citation_counts, is_citations_indexed
+from utils.kanoon_api import fetch_case_by_docid
+
+router = APIRouter()
+
+@router.get("/citations/{docid}/cites", tags=["Citations"])
+async def cites(docid: str, background_tasks: BackgroundTasks):
+    edges = await get_cites(docid)
+    indexed = bool(edges) or await is_citations_indexed(docid)
+    if not indexed:
+        # First lookup for this judgment: fetch it once, answer locally next time.
+        doc = await fetch_case_by_docid(docid)
+        if "error" not in doc:
+            edges = [
+                {"kind": kind, "target": target}
+                for kind, target in extract_citations(docid, doc.get("doc", ""), doc.get("clean_doc", ""))
+            ]
+            background_tasks.add_task(index_case_citations, docid, doc)
+
+    grouped = {"doc": [], "citation": [], "statute": []}
+    for edge in edges:
+        grouped.setdefault(edge["kind"], []).append(edge["target"])
+    return {"docid": docid, "indexed": indexed, "cites": grouped}
+
+@router.get("/citations/{docid}/cited-by", tags=["Citations"])
+async def cited_by(docid: str, limit: int = Query(100, ge=1, le=1000)):
+    # Only covers judgments this service has fetched; Kanoon's own numcitedby is global.
+    return {"docid": docid, "cited_by": await get_cited_by(docid, limit)}
+
+@router.post("/citations/most-cited", tags=["Citations"])
+async def most_cited(request: CitationRankRequest):
+    counts = await get_citation_counts(request.docids)
+    ranked = [
+        {"docid": docid, **counts.get(docid, {"cited_by": 0, "cited_by_within": 0})}
+        for docid in request.docids
+    ]
+    ranked.sort(key=lambda r: (r["cited_by_within"], r["cited_by"]), reverse=True)
+    return {"results": ranked}
@@ -1,61 +1,57 @@
 from fastapi import APIRouter, HTTPException, Query, Depends, Request
-from utils.db import get_pool, save_meta, get_meta, save_summary
-from utils.kanoon_api import fetch_case_by_docid
-from utils.sambonva_utils import summarize_case, hierarchical_relevance
+from fastapi.responses import JSONResponse, StreamingResponse
+from utils.db import DB_ACQUIRE_TIMEOUT, get_pool, get_read_pool, ping_db, pool_stats, save_meta, get_meta, save_summary
+from utils.sambonva_utils import budget_gate, budget_wait_seconds, llm_gate, llm_wait_seconds
+from utils.admission import admission
+from utils.chunk_store import relevance_for_case
+from utils.case_export import csv_header, csv_line, decode_token, encode_token, iter_case_meta, ndjson_line, page_bound
 from typing import List, Optional
 import os
+import secrets
 
 router = APIRouter()
 
 @router.get("/relevance/{docid}")
 async def get_relevance(docid: str, query: str = Query(...), db=Depends(get_pool)):
-    meta = await get_meta(docid)
-
-    # Use cached summary if available
-    if meta and meta.get("summary"):
-        summary = meta["summary"]
-        print(f"[API] Reusing summary from DB for docid={docid}")
-    else:
-        case = await fetch_case_by_docid(docid)
-        case_text = case.get("text") or case.get("clean_doc", "")
-        summary = await summarize_case(case_text)
-        await save_summary(docid, summary)
-        print(f"[API] Summary generated and saved for docid={docid}")
-
-    # Save user query if not present
-    if not meta or not meta.get("query"):
-        await save_meta(docid, query)
-        print(f"[API] Query saved to DB for docid={docid}")
-    else:
-        print(f"[API] Query already exists for docid={docid}")
-
-    # Use hierarchical relevance with summary
-    relevance = await hierarchical_relevance(query, summary)
-    print(f"[API] Relevance computed for docid={docid}")
+    async with admission.admit("relevance", extra_wait=llm_wait_seconds()):
+        meta = await get_meta(docid)
+        cached_summary = meta.get("summary") if meta else None
+
+        # Stored chunk summaries when available; otherwise summarizes (and stores) now
+        relevance, new_summary = await relevance_for_case(docid, query, cached_summary)
+        if new_summary:
+            await save_summary(docid, new_summary)
+            print(f"[API] Summary generated and saved for docid={docid}")
+
+        # Save user query if not present
+        if not meta or not meta.get("query"):
+            await save_meta(docid, query)
+            print(f"[API] Query saved to DB for docid={docid}")
+        else:
+            print(f"[API] Query already exists for docid={docid}")
+
+        print(f"[API] Relevance computed for docid={docid}")
     return {"explanation": relevance}
 
 @router.get("/debug/db", tags=["Debug"])
 async def get_case_meta_data(
     docid: Optional[str] = Query(None, description="Filter by specific docid"),
-    limit: Optional[int] = Query(None, description="Limit the number of results"),
+    limit: int = Query(100, ge=1, le=1000, description="Limit the number of results"),
     db=Depends(get_pool)
 ):
+    # Small ad-hoc peek only; use /export/case_meta for anything bigger.
     query = "SELECT docid, query, modified_query, summary FROM case_meta"
     params = []
 
     if docid:
-        query += " WHERE docid = $1"
         params.append(docid)
+        query += f" WHERE docid = ${len(params)}"
 
-    query += " ORDER BY id DESC"
-    if limit:
-        query += f" LIMIT {limit}"
+    params.append(limit)
+    query += f" ORDER BY docid LIMIT ${len(params)}"
 
     try:
-        if params:
-            rows = await db.fetch(query, *params)
-        else:
-            rows = await db.fetch(query)
+        rows = await db.fetch(query, *params)
 
         return [
             {
@@ -69,6 +65,48 @@ async def get_case_meta_data(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/export/case_meta", tags=["Debug"])
+async def export_case_meta(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    after: Optional[str] = Query(None, description="Resume token from X-Next-Token"),
+    has_summary: Optional[bool] = Query(None),
+    docid_prefix: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    # Dumps every stored user query, so it stays closed unless a token is configured.
+    env_token = os.getenv("EXPORT_TOKEN")
+    token = request.query_params.get("token") or ""
+    if not env_token or not secrets.compare_digest(token.encode(), env_token.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    try:
+        after_docid = decode_token(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid resume token")
+
+    headers = {}
+    until = None
+    if limit:
+        # Fix the page's last docid before streaming and bound the stream by it,
+        # so X-Next-Token always resumes exactly after what was sent.
+        async with get_read_pool().acquire(timeout=DB_ACQUIRE_TIMEOUT) as conn:
+            until, more = await page_bound(conn, limit, after_docid, has_summary, docid_prefix)
+        if more:
+            headers["X-Next-Token"] = encode_token(until)
+
+    async def stream():
+        async with get_read_pool().acquire(timeout=DB_ACQUIRE_TIMEOUT) as conn:
+            if format == "csv":
+                yield csv_header()
+            rows = iter_case_meta(conn, after_docid, has_summary, docid_prefix,
+                                  limit=None if until else limit, until=until)
+            async for row in rows:
+                yield ndjson_line(row) if format == "ndjson" else csv_line(row)
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
+
 @router.api_route("/health", methods=["GET", "HEAD"])
 async def health_check(request: Request):
     token = request.query_params.get("token")
@@ -78,3 +116,32 @@ async def health_check(request: Request):
 
     print("[API] Health check passed")
     return {"status": "ok"}
+
+@router.get("/debug/admission", tags=["Debug"])
+async def admission_stats():
+    return {
+        "lanes": admission.stats(),
+        "llm": {
+            "active": llm_gate.active,
+            "waiting": llm_gate.waiting,
+            "budget_waiting": budget_gate.waiting,
+            "budget_wait_s": round(budget_wait_seconds(), 2),
+            "estimated_wait_s": round(llm_wait_seconds(), 2),
+        },
+    }
+
+@router.get("/debug/pool", tags=["Debug"])
+async def db_pool_stats():
+    return pool_stats()
+
+@router.api_route("/livez", methods=["GET", "HEAD"])
+async def liveness():
+    # Process is up and serving; no dependencies checked.
+    return {"status": "ok"}
+
+@router.api_route("/readyz", methods=["GET", "HEAD"])
+async def readiness(request: Request):
+    db_ok = await ping_db()
+    warm = getattr(request.app.state, "warm", False)
+    body = {"status": "ok" if db_ok and warm else "starting", "db": db_ok, "warm": warm}
+    return JSONResponse(body, status_code=200 if db_ok and warm else 503)
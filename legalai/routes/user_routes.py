@@ -1,5 +1,4 @@
 from fastapi import APIRouter, HTTPException, Header
-from passlib.hash import bcrypt
 from utils.jwt_utils import create_token, verify_token
 from utils.db import get_user_by_email, create_user, get_user_by_id
 from models.schemas import UserSignup, UserLogin
@@ -12,6 +11,7 @@ async def signup(user: UserSignup):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    from passlib.hash import bcrypt  # deferred: passlib is slow to import on cold start
     hashed_pw = bcrypt.hash(user.password)
     user_record = await create_user(user.email, user.name, hashed_pw)
 
@@ -20,6 +20,7 @@ async def signup(user: UserSignup):
 
 @router.post("/login")
 async def login(user: UserLogin):
+    from passlib.hash import bcrypt
     user_record = await get_user_by_email(user.email)
     if not user_record or not bcrypt.verify(user.password, user_record["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
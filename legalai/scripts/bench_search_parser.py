@@ -0,0 +1,88 @@
+"""Benchmark the search-page parser against the old BeautifulSoup version.
+
+Pass saved Indian Kanoon result pages, or nothing to use a synthetic page.
+Run from the legalai/ directory:
+
+    python scripts/bench_search_parser.py saved_pages/*.html --runs 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.parse_cases_from_html import parse_search_results  # noqa: E402
+
+
+def parse_search_results_bs4(html: str):
+    """The previous implementation, kept here as the baseline."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+    for div in soup.find_all("div", class_="result"):
+        title_tag = div.find("a")
+        if not title_tag:
+            continue
+        href = title_tag["href"]
+        court_info_tag = div.find("span", class_="docsource")
+        snippet = div.find("p", class_="snippet")
+        results.append({
+            "title": title_tag.text.strip(),
+            "docid": href.split("/")[-2] if href else None,
+            "url": f"https://indiankanoon.org{href}",
+            "court_info": court_info_tag.text.strip() if court_info_tag else "",
+            "summary": snippet.text.strip() if snippet else "",
+        })
+    return results
+
+
+def synthetic_page(n: int = 10) -> str:
+    chrome = "<div class='nav'>" + "<a href='/x'>link</a>" * 400 + "</div>"
+    results = "".join(
+        f'<div class="result"><div class="result_title"><a href="/docfragment/{1000 + i}/?formInput=bail">'
+        f"State Of Maharashtra vs Accused {i} on 12 March, 2019</a></div>"
+        f'<p class="snippet">{"Held that <b>anticipatory bail</b> under Section 438 CrPC " * 20}</p>'
+        f'<div class="hlbottom"><span class="docsource">Bombay High Court</span>'
+        f'<a class="cite_tag" href="/search/?formInput=citedby:{1000 + i}">Cited by {i * 7}</a></div></div>'
+        for i in range(n)
+    )
+    return f"<html><head>{'<script>var x=1;</script>' * 50}</head><body>{chrome}<b>1 - {n} of 5,432</b>{results}{chrome}</body></html>"
+
+
+def bench(fn, pages, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for html in pages:
+            fn(html)
+        times.append((time.perf_counter() - start) * 1000 / len(pages))
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    if not pages:
+        pages = [synthetic_page()]
+
+    streaming = bench(parse_search_results, pages, args.runs)
+    print(f"pages: {len(pages)}, avg size {sum(map(len, pages)) / len(pages) / 1024:.0f} KiB")
+    print(f"streaming parser:   {streaming:.2f} ms/page")
+    try:
+        baseline = bench(parse_search_results_bs4, pages, args.runs)
+        print(f"BeautifulSoup tree: {baseline:.2f} ms/page ({baseline / streaming:.1f}x slower)")
+    except ImportError:
+        print("BeautifulSoup not installed; baseline skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Startup-time benchmark.
+
+Measures, in fresh interpreters, how long `import main` takes and which
+heavy modules end up loaded. Run from the legalai/ directory:
+
+    python scripts/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["openai", "bs4", "passlib", "jose", "httpx", "asyncpg"]
+
+PROBE = f"""
+import json, sys, time
+t0 = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "import_s": elapsed,
+    "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once(cwd: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = [run_once(cwd) for _ in range(args.runs)]
+    times = [s["import_s"] * 1000 for s in samples]
+
+    print(f"runs:    {args.runs}")
+    print(f"median:  {statistics.median(times):.1f} ms")
+    print(f"min/max: {min(times):.1f} / {max(times):.1f} ms")
+    print(f"heavy modules loaded at import: {', '.join(samples[-1]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
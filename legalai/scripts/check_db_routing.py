@@ -0,0 +1,65 @@
+"""Check read/write routing against two local Postgres instances.
+
+Start a primary and a second instance (a streaming replica, or just another
+empty database with the same schema), then run from the legalai/ directory:
+
+    DATABASE_URL=postgresql://localhost:5432/legalai \
+    DATABASE_REPLICA_URL=postgresql://localhost:5433/legalai \
+    DB_READ_YOUR_WRITES_SECONDS=1 \
+    python scripts/check_db_routing.py
+
+With two independent databases the replica never sees the write, which makes
+the routing decision directly observable.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import db  # noqa: E402
+from utils.migrations import apply_migrations  # noqa: E402
+
+
+async def main():
+    if not db.DATABASE_REPLICA_URL:
+        sys.exit("DATABASE_REPLICA_URL must be set")
+
+    await db.init_db()
+    async with db.read_pool.acquire() as conn:
+        await apply_migrations(conn)
+
+    docid = f"routing-check-{int(time.time())}"
+    await db.save_summary(docid, "written to primary")
+
+    meta = await db.get_meta(docid)
+    assert meta and meta["summary"] == "written to primary", "read-your-writes should hit the primary"
+    print("[CHECK] read after own write served by primary")
+
+    await asyncio.sleep(db.DB_READ_YOUR_WRITES_SECONDS + 0.1)
+    assert db._reader(f"doc:{docid}") is db.read_pool, "reads should return to the replica"
+    print("[CHECK] reads routed back to replica after the window")
+
+    # asyncpg's statement cache leaves named prepared statements on the session;
+    # with DB_STATEMENT_CACHE_SIZE=0 (PgBouncer transaction mode) there must be none.
+    async with db.pool.acquire() as conn:
+        for _ in range(3):
+            await conn.fetchrow("SELECT * FROM case_meta WHERE docid = $1", docid)
+        # Pattern passed as a parameter so this query doesn't match itself.
+        prepared = await conn.fetchval(
+            "SELECT count(*) FROM pg_prepared_statements WHERE statement LIKE $1", "%FROM case_meta WHERE docid%"
+        )
+    if db.DB_STATEMENT_CACHE_SIZE:
+        assert prepared == 1, f"expected one cached statement reused, found {prepared}"
+    else:
+        assert prepared == 0, f"statement cache disabled but {prepared} statements prepared"
+    print(f"[CHECK] statement cache (size {db.DB_STATEMENT_CACHE_SIZE}): {prepared} prepared statement(s)")
+
+    async with db.pool.acquire() as conn:
+        await conn.execute("DELETE FROM case_meta WHERE docid = $1", docid)
+    await db.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
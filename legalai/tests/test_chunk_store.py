@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from utils.chunk_store import chunk_with_offsets  # noqa: E402
+
+
+def _judgment(size: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    while total < size:
+        line = "x" * rng.randint(200, 3000)
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+def test_spans_cover_text_contiguously():
+    text = _judgment(250_000)
+    spans = chunk_with_offsets(text, max_chars=100_000, max_chunks=39)
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(a[1] == b[0] for a, b in zip(spans, spans[1:]))
+    assert all(text[end - 1] == "\n" for _, end in spans[:-1])
+
+
+def test_chunk_cap_is_enforced_on_long_texts():
+    text = _judgment(4_800_000)
+    spans = chunk_with_offsets(text, max_chars=100_000, max_chunks=39)
+    assert len(spans) <= 39
+    assert spans[-1][1] == len(text)
+
+
+def test_short_text_is_one_chunk_and_empty_text_none():
+    assert chunk_with_offsets("short judgment\n", max_chars=100_000, max_chunks=39) == [(0, 15)]
+    assert chunk_with_offsets("", max_chars=100_000, max_chunks=39) == []
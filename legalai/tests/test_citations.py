@@ -0,0 +1,44 @@
+from utils.citations import KIND_CITATION, KIND_DOC, KIND_STATUTE, extract_citations
+
+JUDGMENT = """
+Under section 5 of the said act the authority may proceed. Section 3 of the Act
+is not attracted. The appellant was convicted under Section 302 of the Indian Penal
+Code and Section 25 of the Arms Act, 1959. Bail was sought u/s 438 Cr.P.C. and
+under Section 13(1)(ia) of the Hindu Marriage
+Act, 1955. See Kesavananda Bharati, AIR 1973 SC 1461, and (2014) 8 SCC 273,
+on Article 21 of the Constitution. Section 2(d) of the Principal Act defines it.
+"""
+
+
+def test_statute_edges_are_normalised():
+    edges = extract_citations("100", "", JUDGMENT)
+    statutes = {target for kind, target in edges if kind == KIND_STATUTE}
+    assert statutes == {
+        "Section 302 IPC",
+        "Section 25 Arms Act",
+        "Section 438 CrPC",
+        "Section 13(1)(ia) Hindu Marriage Act",
+        "Article 21",
+    }
+
+
+def test_reporter_citations_and_doc_links():
+    html = '<a href="/doc/200/">x</a> <a href="/doc/100/">self</a>'
+    edges = extract_citations("100", html, JUDGMENT)
+    assert (KIND_DOC, "200") in edges
+    assert (KIND_DOC, "100") not in edges
+    assert (KIND_CITATION, "AIR 1973 SC 1461") in edges
+    assert (KIND_CITATION, "(2014) 8 SCC 273") in edges
+
+
+def test_section_case_and_connector_act_names():
+    text = (
+        "Section 498a IPC and Section 498A of the Indian Penal Code. Section 34 of the "
+        "Arbitration and Conciliation Act, 1996 and Section 13 of the Prevention of Corruption Act."
+    )
+    statutes = {target for kind, target in extract_citations("1", "", text) if kind == KIND_STATUTE}
+    assert statutes == {
+        "Section 498A IPC",
+        "Section 34 Arbitration and Conciliation Act",
+        "Section 13 Prevention of Corruption Act",
+    }
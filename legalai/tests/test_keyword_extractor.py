@@ -0,0 +1,54 @@
+from utils.keyword_extractor import KeywordExtractor, normalize_section, normalize_statute
+
+
+def test_lowercase_words_are_not_an_act_name():
+    keywords, _ = KeywordExtractor().extract("section 302 and the arms act murder")
+    assert keywords[0] == "Section 302"
+    assert "Section 302 and the arms act" not in keywords
+    assert "murder" in keywords
+
+
+def test_this_act_is_not_a_statute():
+    keywords, _ = KeywordExtractor().extract("section 9 of this act")
+    assert keywords == ["Section 9"]
+
+
+def test_named_acts_and_abbreviations():
+    extract = KeywordExtractor().extract
+    assert extract("section 25 of the Arms Act")[0] == ["Section 25 Arms Act"]
+    assert extract("Section 13 of the Hindu Marriage Act, 1955")[0] == ["Section 13 Hindu Marriage Act"]
+    assert extract("bail u/s 438 Cr.P.C.")[0] == ["Section 438 CrPC", "bail"]
+    assert extract("section 302 of the indian penal code")[0] == ["Section 302 IPC"]
+
+
+def test_known_phrases_raise_confidence():
+    keywords, confidence = KeywordExtractor().extract("Section 138 NI Act cheque bounce")
+    assert keywords == ["Section 138 NI Act", "cheque bounce"]
+    assert confidence == 1.0
+
+
+def test_long_prose_has_low_confidence():
+    _, confidence = KeywordExtractor().extract(
+        "my neighbour built a wall blocking the drain and water floods my house every monsoon"
+    )
+    assert confidence < 0.5
+
+
+def test_normalize_statute():
+    assert normalize_statute("Hindu  Marriage\nAct, 1955") == "Hindu Marriage Act"
+    assert normalize_statute("Cr.P.C.") == "CrPC"
+    assert normalize_statute("Indian Penal Code") == "IPC"
+
+
+def test_act_names_with_connectors():
+    extract = KeywordExtractor().extract
+    assert extract("Section 34 of the Arbitration and Conciliation Act")[0] == [
+        "Section 34 Arbitration and Conciliation Act"
+    ]
+    assert extract("Section 3 of The Prevention of Corruption Act")[0] == ["Section 3 Prevention of Corruption Act"]
+    assert extract("section 5 of the Act and the Arms Act")[0][0] == "Section 5"
+
+
+def test_section_suffix_is_uppercased():
+    assert KeywordExtractor().extract("section 498a IPC")[0] == ["Section 498A IPC"]
+    assert normalize_section("13 (1)(ia)") == "13(1)(ia)"
@@ -0,0 +1,49 @@
+from utils.parse_cases_from_html import parse_search_page, to_search_response
+
+# Shape of an Indian Kanoon results page: chrome, a result count, then
+# <article class="result"> blocks with the date at the end of the title.
+PAGE = """
+<html><head><script>var x = 1;</script></head><body>
+<div class="nav"><a href="/browse/">Browse</a></div>
+<div class="results_middle"><b>1 - 2 of 1,234 </b>
+<article class="result" role="article">
+  <h4 class="result_title">
+    <a href="/docfragment/1234567/?formInput=anticipatory%20bail"><b>Anticipatory Bail</b> - Sushila Aggarwal vs State (Nct Of Delhi) on 29 January, 2020</a>
+  </h4>
+  <div class="headline">The protection granted under <b>Section 438</b> Cr.P.C. should not invariably be limited&hellip;</div>
+  <div class="hlbottom">
+    <span class="docsource">Supreme Court of India</span>
+    <a class="cite_tag" href="/search/?formInput=citedby:1234567">Cited by 1,402</a>
+    <a class="cite_tag" href="/doc/1234567/">Full Document</a>
+  </div>
+</article>
+<article class="result" role="article">
+  <h4 class="result_title"><a href="/docfragment/7654321/?formInput=anticipatory%20bail">Gurbaksh Singh Sibbia vs State Of Punjab</a></h4>
+  <div class="headline">Bail</div>
+  <div class="hlbottom"><span class="docsource">Supreme Court of India</span></div>
+</article>
+</div>
+<div class="footer">&copy; Indian Kanoon</div>
+</body></html>
+"""
+
+
+def test_parses_article_results_with_dates():
+    page = parse_search_page(PAGE)
+    assert page["found"] == "1 - 2 of 1,234"
+    first, second = page["results"]
+    assert first["docid"] == "1234567"
+    assert first["title"] == "Anticipatory Bail - Sushila Aggarwal vs State (Nct Of Delhi) on 29 January, 2020"
+    assert first["court_info"] == "Supreme Court of India"
+    assert first["summary"].startswith("The protection granted under Section 438 Cr.P.C.")
+    assert first["numcitedby"] == 1402
+    assert first["publishdate"] == "2020-01-29"
+    assert second["publishdate"] is None
+    assert second["numcitedby"] is None
+
+
+def test_search_response_carries_publishdate():
+    docs = to_search_response(parse_search_page(PAGE))["docs"]
+    assert [d["tid"] for d in docs] == [1234567, 7654321]
+    assert docs[0]["publishdate"] == "2020-01-29"
+    assert docs[0]["fragment"] == docs[0]["headline"]
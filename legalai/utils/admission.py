@@ -0,0 +1,163 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from fastapi import HTTPException
+
+# Lower number wins. Interactive traffic should never queue behind background work.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Priority of the request currently being served; read by the LLM gate.
+current_priority: ContextVar[int] = ContextVar("current_priority", default=PRIORITY_BACKGROUND)
+
+
+class PriorityGate:
+    """Concurrency limiter whose waiters are woken in priority order (FIFO within a priority)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: int):
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # Slot was handed to us just before cancellation; pass it on.
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)  # slot moves to the waiter, active count unchanged
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class Lane:
+    def __init__(self, name: str, limit: int, priority: int, max_wait: float, initial_estimate: float):
+        self.name = name
+        self.limit = limit
+        self.priority = priority
+        self.max_wait = max_wait
+        self.avg_service_s = initial_estimate
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.sem = asyncio.Semaphore(limit)
+
+    def estimated_wait(self) -> float:
+        if self.active < self.limit:
+            return 0.0
+        # Everyone already queued plus us, drained `limit` at a time.
+        return math.ceil((self.waiting + 1) / self.limit) * self.avg_service_s
+
+    def record(self, elapsed: float, alpha: float = 0.2):
+        self.avg_service_s = (1 - alpha) * self.avg_service_s + alpha * elapsed
+
+
+class AdmissionController:
+    def __init__(self):
+        self.lanes: dict[str, Lane] = {}
+
+    def add_lane(self, name: str, limit: int, priority: int, max_wait: float, initial_estimate: float):
+        self.lanes[name] = Lane(name, limit, priority, max_wait, initial_estimate)
+
+    @asynccontextmanager
+    async def admit(self, name: str, extra_wait: float = 0.0):
+        """Run the body under the lane's concurrency limit, or fail fast with 503 + Retry-After.
+
+        extra_wait is time the request will spend queued downstream (e.g. on the
+        LLM gate and budget); it counts against the lane's max_wait.
+        """
+        lane = self.lanes[name]
+        wait = lane.estimated_wait() + extra_wait
+        if wait > lane.max_wait:
+            lane.rejected += 1
+            retry_after = max(1, math.ceil(wait))
+            print(f"[ADMISSION] Rejected {name}: estimated wait {wait:.1f}s > {lane.max_wait:.1f}s")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy, retry in {retry_after}s",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        lane.waiting += 1
+        try:
+            await lane.sem.acquire()
+        finally:
+            lane.waiting -= 1
+
+        lane.active += 1
+        token = current_priority.set(lane.priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            lane.record(time.monotonic() - start)
+            current_priority.reset(token)
+            lane.active -= 1
+            lane.sem.release()
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "active": lane.active,
+                "waiting": lane.waiting,
+                "limit": lane.limit,
+                "rejected": lane.rejected,
+                "estimated_wait_s": round(lane.estimated_wait(), 2),
+            }
+            for name, lane in self.lanes.items()
+        }
+
+
+admission = AdmissionController()
+admission.add_lane(
+    "search",
+    limit=int(os.getenv("ADMIT_SEARCH_CONCURRENCY", "32")),
+    priority=PRIORITY_INTERACTIVE,
+    max_wait=float(os.getenv("ADMIT_SEARCH_MAX_WAIT", "10")),
+    initial_estimate=3.0,
+)
+admission.add_lane(
+    "summarize",
+    limit=int(os.getenv("ADMIT_SUMMARIZE_CONCURRENCY", "4")),
+    priority=PRIORITY_BACKGROUND,
+    max_wait=float(os.getenv("ADMIT_SUMMARIZE_MAX_WAIT", "30")),
+    initial_estimate=20.0,
+)
+admission.add_lane(
+    "relevance",
+    limit=int(os.getenv("ADMIT_RELEVANCE_CONCURRENCY", "4")),
+    priority=PRIORITY_BACKGROUND,
+    max_wait=float(os.getenv("ADMIT_RELEVANCE_MAX_WAIT", "30")),
+    initial_estimate=20.0,
+)
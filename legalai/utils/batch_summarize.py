@@ -0,0 +1,239 @@
+"""Offline batch summarization to pre-warm case_meta.summary.
+
+Fetches judgments from Indian Kanoon with bounded concurrency, cleans the HTML
+in a process pool, summarizes under the SambaNova per-minute budget and writes
+summaries in bulk. Finished docids are appended to a checkpoint file after each
+write, so an interrupted run picks up where it stopped.
+
+Run from the legalai/ directory:
+
+    python -m utils.batch_summarize --docids popular.txt
+    python -m utils.batch_summarize --query "anticipatory bail" --query "section 498A IPC" --pages 3
+    python -m utils.batch_summarize --docids popular.txt --dry-run
+
+The budget is per process; when the API is live, lower --calls-per-minute so
+the two together stay under the account limit.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import orjson
+
+from utils import sambonva_utils
+from utils.chunk_store import summarize_document
+from utils.kanoon_api import clean_html_doc, fetch_case_by_docid, fetch_cases, close_http_client
+
+
+class Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed * 60 if elapsed else 0.0
+        remaining = self.total - self.done - self.failed
+        eta = remaining / rate if rate else float("inf")
+        print(
+            f"[BATCH] {self.done}/{self.total} done, {self.failed} failed, "
+            f"{rate:.1f} docs/min, ETA {eta:.0f} min, "
+            f"LLM calls this minute {sambonva_utils.SAMBA_CALLS_THIS_MINUTE}/{sambonva_utils.SAMBA_CHUNK_LIMIT_PER_MIN}"
+        )
+
+
+def load_checkpoint(path: str) -> set:
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+async def collect_docids(args) -> List[str]:
+    docids = []
+    if args.docids:
+        with open(args.docids) as f:
+            docids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    for n, query in enumerate(args.query or []):
+        for page in range(args.pages):
+            if args.dry_run:
+                docids.extend(f"stub-{n}-{page}-{i}" for i in range(10))
+                continue
+            result = await fetch_cases({"formInput": query, "pagenum": str(page)})
+            page_ids = [str(d["tid"]) for d in result.get("docs", []) if d.get("tid")]
+            if not page_ids:
+                break
+            docids.extend(page_ids)
+
+    # Preserve order (most relevant first), drop duplicates.
+    return list(dict.fromkeys(docids))
+
+
+# ──────────────── Dry-run stubs ────────────────
+
+async def _stub_fetch(docid: str, stub_dir: Optional[str]) -> dict:
+    await asyncio.sleep(random.uniform(0.01, 0.05))
+    if stub_dir and os.path.exists(os.path.join(stub_dir, f"{docid}.html")):
+        with open(os.path.join(stub_dir, f"{docid}.html")) as f:
+            return {"tid": docid, "doc": f.read()}
+    paragraphs = "".join(f"<p>Paragraph {i} of stub judgment {docid}.</p>" for i in range(200))
+    return {"tid": docid, "doc": f"<div>{paragraphs}</div>"}
+
+
+async def _stub_llm(prompt: str, max_tokens: int = 256, temperature: float = 0.3) -> str:
+    # Still charged against the per-minute budget so throughput numbers are realistic.
+    await sambonva_utils._reserve_budget()
+    await asyncio.sleep(random.uniform(0.05, 0.2))
+    return f"Stub summary of {len(prompt)} prompt characters."
+
+
+# ──────────────── Pipeline ────────────────
+
+async def run(args):
+    if args.dry_run:
+        args.checkpoint += ".dry-run"
+    elif not sambonva_utils.SAMBA_API_KEY:
+        # call_sambonva returns an error string without a key, which would be saved as every summary.
+        raise SystemExit("SAMBA_API_KEY is not set; pass --dry-run to try the pipeline without it")
+    docids = await collect_docids(args)
+    done = load_checkpoint(args.checkpoint)
+    docids = [d for d in docids if d not in done]
+
+    if not args.dry_run:
+        from utils.db import init_db, get_summarized_docids
+        await init_db()
+        if not args.force:
+            existing = await get_summarized_docids(docids)
+            docids = [d for d in docids if d not in existing]
+
+    progress = Progress(len(docids))
+    print(f"[BATCH] {len(docids)} docids to summarize ({len(done)} already checkpointed)")
+    if not docids:
+        return
+
+    if args.dry_run:
+        sambonva_utils.call_sambonva = _stub_llm
+    sambonva_utils.SAMBA_CHUNK_LIMIT_PER_MIN = args.calls_per_minute
+
+    fetch_sem = asyncio.Semaphore(args.fetch_concurrency)
+    queue: asyncio.Queue = asyncio.Queue()
+    for docid in docids:
+        queue.put_nowait(docid)
+
+    pending = []
+    write_lock = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+
+    async def flush():
+        async with write_lock:
+            if not pending:
+                return
+            batch = pending[:]
+            pending.clear()
+            try:
+                if not args.dry_run:
+                    from utils.db import save_summaries
+                    await save_summaries(batch)
+            except Exception:
+                # Keep the summaries (they cost LLM calls) for the next flush.
+                pending[:0] = batch
+                raise
+            with open(args.checkpoint, "a") as f:
+                f.writelines(f"{docid}\n" for docid, _ in batch)
+            progress.done += len(batch)
+
+    async def worker(executor):
+        while True:
+            try:
+                docid = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                async with fetch_sem:
+                    doc = await (_stub_fetch(docid, args.stub_dir) if args.dry_run
+                                 else fetch_case_by_docid(docid, clean=False))
+                if "error" in doc:
+                    raise RuntimeError(doc["error"])
+
+                text = await loop.run_in_executor(executor, clean_html_doc, doc.get("doc", ""))
+                if not text.strip():
+                    raise RuntimeError("empty judgment text")
+                summary = await summarize_document(docid, text, store=not args.dry_run)
+                # Saving an empty summary would mark the docid done for every later run.
+                if not summary.strip():
+                    raise RuntimeError("empty summary")
+                pending.append((docid, summary))
+            except Exception as e:
+                progress.failed += 1
+                print(f"[BATCH] Failed docid={docid}: {e}")
+                continue
+
+            if len(pending) >= args.write_batch:
+                try:
+                    await flush()
+                except Exception as e:
+                    print(f"[BATCH] Writing {len(pending)} summaries failed, retrying with the next batch: {e}")
+
+    async def final_flush(attempts: int = 3):
+        for attempt in range(1, attempts + 1):
+            try:
+                return await flush()
+            except Exception as e:
+                print(f"[BATCH] Final write of {len(pending)} summaries failed (attempt {attempt}/{attempts}): {e}")
+                await asyncio.sleep(2 ** attempt)
+        # Don't drop paid-for summaries; they can be loaded with `utils.case_export import --on-conflict update`.
+        unsaved = args.checkpoint + ".unsaved.ndjson"
+        with open(unsaved, "ab") as f:
+            f.writelines(orjson.dumps({"docid": docid, "summary": summary}) + b"\n" for docid, summary in pending)
+        raise SystemExit(f"[BATCH] {len(pending)} summaries could not be saved; written to {unsaved}")
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(args.report_every)
+            progress.report()
+
+    report_task = asyncio.create_task(reporter())
+    try:
+        with ProcessPoolExecutor(max_workers=args.clean_processes) as executor:
+            await asyncio.gather(*(worker(executor) for _ in range(args.workers)))
+        await final_flush()
+    finally:
+        report_task.cancel()
+        await close_http_client()
+        if not args.dry_run:
+            from utils.db import close_db
+            await close_db()
+    progress.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm case summaries in bulk")
+    parser.add_argument("--docids", help="file with one docid per line")
+    parser.add_argument("--query", action="append", help="search query to sweep (repeatable)")
+    parser.add_argument("--pages", type=int, default=1, help="result pages per --query")
+    parser.add_argument("--checkpoint", default="batch_summarize.checkpoint")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--fetch-concurrency", type=int, default=4)
+    parser.add_argument("--clean-processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--calls-per-minute", type=int, default=sambonva_utils.SAMBA_CHUNK_LIMIT_PER_MIN)
+    parser.add_argument("--write-batch", type=int, default=25)
+    parser.add_argument("--report-every", type=float, default=30.0, help="seconds between progress lines")
+    parser.add_argument("--force", action="store_true", help="re-summarize docids that already have a summary")
+    parser.add_argument("--dry-run", action="store_true", help="stub Kanoon and SambaNova, skip DB writes")
+    parser.add_argument("--stub-dir", help="dry-run: directory of <docid>.html files to use instead of generated HTML")
+    args = parser.parse_args()
+
+    if not args.docids and not args.query:
+        parser.error("pass --docids and/or --query")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
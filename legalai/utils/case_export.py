@@ -0,0 +1,241 @@
+"""Streaming export and COPY-based import of case_meta.
+
+Export walks the table in docid order through a server-side cursor, so memory
+stays flat no matter how many rows there are. Resume tokens are keyset
+positions (the last docid sent), never offsets.
+
+CLI, run from the legalai/ directory:
+
+    python -m utils.case_export export --out case_meta.ndjson
+    python -m utils.case_export export --out case_meta.ndjson --resume
+    python -m utils.case_export export --out case_meta.csv --format csv --has-summary
+    python -m utils.case_export import --in case_meta.ndjson --on-conflict update
+"""
+import argparse
+import asyncio
+import base64
+import csv
+import io
+import os
+from typing import AsyncIterator, Optional, Tuple
+
+import asyncpg
+import orjson
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXPORT_COLUMNS = ("docid", "query", "modified_query", "summary")
+CURSOR_PREFETCH = int(os.getenv("EXPORT_CURSOR_PREFETCH", "500"))
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "50000"))
+
+
+def encode_token(docid: str) -> str:
+    return base64.urlsafe_b64encode(docid.encode()).decode().rstrip("=")
+
+
+def decode_token(token: str) -> str:
+    padded = token + "=" * (-len(token) % 4)
+    return base64.urlsafe_b64decode(padded.encode()).decode()
+
+
+def _where(after: Optional[str], has_summary: Optional[bool], docid_prefix: Optional[str],
+           until: Optional[str] = None):
+    clauses, params = [], []
+    if after is not None:
+        params.append(after)
+        clauses.append(f"docid > ${len(params)}")
+    if until is not None:
+        params.append(until)
+        clauses.append(f"docid <= ${len(params)}")
+    if has_summary is True:
+        clauses.append("summary IS NOT NULL")
+    elif has_summary is False:
+        clauses.append("summary IS NULL")
+    if docid_prefix:
+        params.append(docid_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        clauses.append(f"docid LIKE ${len(params)}")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+async def page_bound(conn, limit: int, after: Optional[str] = None, has_summary: Optional[bool] = None,
+                     docid_prefix: Optional[str] = None) -> Tuple[Optional[str], bool]:
+    """Last docid of the next `limit` rows, and whether any rows follow it.
+
+    The page is then streamed with `docid <= bound` rather than LIMIT, so a row
+    inserted into the range in between is sent instead of pushed past the
+    resume token. Only docids are selected, so without has_summary this is an
+    index-only walk of the primary key rather than a second read of the rows.
+    """
+    where, params = _where(after, has_summary, docid_prefix)
+    params.append(limit)
+    bound = await conn.fetchval(
+        f"SELECT max(docid) FROM (SELECT docid FROM case_meta{where} ORDER BY docid LIMIT ${len(params)}) page",
+        *params,
+    )
+    if bound is None:
+        return None, False
+    where, params = _where(bound, has_summary, docid_prefix)
+    more = await conn.fetchval(f"SELECT EXISTS (SELECT 1 FROM case_meta{where})", *params)
+    return bound, more
+
+
+async def iter_case_meta(conn, after: Optional[str] = None, has_summary: Optional[bool] = None,
+                         docid_prefix: Optional[str] = None, limit: Optional[int] = None,
+                         until: Optional[str] = None) -> AsyncIterator[asyncpg.Record]:
+    where, params = _where(after, has_summary, docid_prefix, until)
+    sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM case_meta{where} ORDER BY docid"
+    if limit:
+        params.append(limit)
+        sql += f" LIMIT ${len(params)}"
+
+    # Server-side cursors only live inside a transaction.
+    async with conn.transaction(readonly=True):
+        async for row in conn.cursor(sql, *params, prefetch=CURSOR_PREFETCH):
+            yield row
+
+
+def ndjson_line(row) -> bytes:
+    return orjson.dumps({col: row[col] for col in EXPORT_COLUMNS}) + b"\n"
+
+
+def csv_line(row) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerow([row[col] for col in EXPORT_COLUMNS])
+    return buf.getvalue()
+
+
+def csv_header() -> str:
+    return ",".join(EXPORT_COLUMNS) + "\r\n"
+
+
+# ──────────────── Import ────────────────
+
+async def _merge_staging(conn, on_conflict: str) -> int:
+    if on_conflict == "update":
+        action = """DO UPDATE SET query = COALESCE(EXCLUDED.query, case_meta.query),
+                                   modified_query = COALESCE(EXCLUDED.modified_query, case_meta.modified_query),
+                                   summary = COALESCE(EXCLUDED.summary, case_meta.summary)"""
+    else:
+        action = "DO NOTHING"
+    result = await conn.execute(f"""
+        INSERT INTO case_meta (docid, query, modified_query, summary)
+        SELECT DISTINCT ON (docid) docid, query, modified_query, summary FROM case_meta_import
+        ON CONFLICT (docid) {action}
+    """)
+    await conn.execute("TRUNCATE case_meta_import")
+    return int(result.split()[-1])
+
+
+async def import_case_meta(conn, path: str, fmt: str = "ndjson", on_conflict: str = "skip") -> int:
+    """COPY rows into a temp staging table in bounded batches, then upsert into case_meta."""
+    await conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS case_meta_import
+        (docid TEXT, query TEXT, modified_query TEXT, summary TEXT) ON COMMIT PRESERVE ROWS
+    """)
+    merged = 0
+
+    if fmt == "csv":
+        async with conn.transaction():
+            await conn.copy_to_table("case_meta_import", source=path, format="csv", header=True,
+                                     columns=list(EXPORT_COLUMNS))
+            merged += await _merge_staging(conn, on_conflict)
+        return merged
+
+    batch = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            batch.append(tuple(record.get(col) for col in EXPORT_COLUMNS))
+            if len(batch) >= IMPORT_BATCH_ROWS:
+                async with conn.transaction():
+                    await conn.copy_records_to_table("case_meta_import", records=batch, columns=list(EXPORT_COLUMNS))
+                    merged += await _merge_staging(conn, on_conflict)
+                print(f"[IMPORT] {merged} rows merged")
+                batch = []
+    if batch:
+        async with conn.transaction():
+            await conn.copy_records_to_table("case_meta_import", records=batch, columns=list(EXPORT_COLUMNS))
+            merged += await _merge_staging(conn, on_conflict)
+    return merged
+
+
+# ──────────────── CLI ────────────────
+
+def _last_exported_docid(path: str) -> Optional[str]:
+    """Read only the tail of an earlier NDJSON export to find where to resume."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        f.seek(max(0, os.path.getsize(path) - (1 << 20)))
+        lines = f.read().splitlines()
+    # Skip a torn last line from an interrupted run.
+    for line in reversed(lines):
+        try:
+            return orjson.loads(line)["docid"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            continue
+    return None
+
+
+async def _export_cli(args):
+    after = decode_token(args.after) if args.after else None
+    if args.resume:
+        # CSV records can span lines, so the tail can't be parsed reliably; use --after instead.
+        if args.format != "ndjson":
+            raise SystemExit("--resume needs --format ndjson; pass the printed token via --after for CSV")
+        after = _last_exported_docid(args.out) or after
+    mode = "ab" if args.resume and os.path.exists(args.out) else "wb"
+
+    conn = await asyncpg.connect(os.getenv("DATABASE_REPLICA_URL") or os.getenv("DATABASE_URL"))
+    count = 0
+    try:
+        with open(args.out, mode) as out:
+            if args.format == "csv" and mode == "wb":
+                out.write(csv_header().encode())
+            async for row in iter_case_meta(conn, after, args.has_summary, args.prefix, args.limit):
+                out.write(ndjson_line(row) if args.format == "ndjson" else csv_line(row).encode())
+                count += 1
+                last = row["docid"]
+                if count % 10000 == 0:
+                    print(f"[EXPORT] {count} rows, resume token {encode_token(last)}")
+    finally:
+        await conn.close()
+    print(f"[EXPORT] Done: {count} rows written to {args.out}")
+
+
+async def _import_cli(args):
+    conn = await asyncpg.connect(os.getenv("DATABASE_URL"))
+    try:
+        merged = await import_case_meta(conn, args.input, args.format, args.on_conflict)
+    finally:
+        await conn.close()
+    print(f"[IMPORT] Done: {merged} rows merged into case_meta")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/import case_meta")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export")
+    exp.add_argument("--out", required=True)
+    exp.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    exp.add_argument("--after", help="resume token from a previous export")
+    exp.add_argument("--resume", action="store_true", help="append to --out after its last row")
+    exp.add_argument("--has-summary", action="store_true", default=None)
+    exp.add_argument("--prefix", help="only docids starting with this")
+    exp.add_argument("--limit", type=int)
+
+    imp = sub.add_parser("import")
+    imp.add_argument("--in", dest="input", required=True)
+    imp.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    imp.add_argument("--on-conflict", choices=["skip", "update"], default="skip")
+
+    args = parser.parse_args()
+    asyncio.run(_export_cli(args) if args.command == "export" else _import_cli(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import os
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from utils import sambonva_utils
+from utils.sambonva_utils import (
+    CHUNK_SUMMARY_PROMPT,
+    combine_summaries,
+    hierarchical_relevance,
+    summarize_chunk,
+)
+
+# Size of a map-stage chunk, as in smart_chunk_text. Whole judgments are covered; there is no truncation.
+CHUNK_SUMMARY_CHARS = int(os.getenv("CHUNK_SUMMARY_CHARS", "100000"))
+# Relevance reads stored chunk summaries in windows of this size (one LLM call each).
+RELEVANCE_WINDOW_CHARS = int(os.getenv("RELEVANCE_WINDOW_CHARS", "20000"))
+
+PROMPT_VERSION = hashlib.sha1(CHUNK_SUMMARY_PROMPT.encode()).hexdigest()[:12]
+
+
+def chunk_with_offsets(text: str, max_chars: int = CHUNK_SUMMARY_CHARS,
+                       max_chunks: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Paragraph-aligned (start, end) spans, at most max_chunks of them.
+
+    Deterministic, so unchanged text maps to the same chunks.
+    """
+    if max_chunks is None:
+        # Leave one call of the per-minute budget for the combine step.
+        max_chunks = max(1, sambonva_utils.SAMBA_CHUNK_LIMIT_PER_MIN - 1)
+    if len(text) > max_chars * max_chunks:
+        # Keep very long judgments to at most max_chunks calls.
+        max_chars = -(-len(text) // max_chunks)
+
+    spans = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            newline = text.rfind("\n", start, end)
+            if newline > start:
+                end = newline + 1
+        spans.append((start, end))
+        start = end
+    if len(spans) > max_chunks:
+        # Pulling ends back to newlines can leave a remainder span; fold it into the last chunk.
+        spans[max_chunks - 1:] = [(spans[max_chunks - 1][0], spans[-1][1])]
+    return spans
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha1(chunk.encode()).hexdigest()
+
+
+async def summarize_chunks(docid: Optional[str], text: str, store: bool = True) -> List[tuple]:
+    """Map stage over the full text, reusing stored chunk summaries whose text and prompt are unchanged.
+
+    Returns (index, start, end, hash, prompt_version, summary) records.
+    """
+    from utils.db import get_case_chunks, save_case_chunks
+
+    previous = {}
+    if store and docid:
+        for row in await get_case_chunks(docid):
+            if row["prompt_version"] == PROMPT_VERSION:
+                previous[row["chunk_hash"]] = row["summary"]
+
+    spans = chunk_with_offsets(text)
+    chunks = [text[start:end].strip() for start, end in spans]
+    digests = [chunk_hash(chunk) for chunk in chunks]
+
+    # Map calls run concurrently; llm_gate bounds how many are in flight.
+    missing = [i for i, digest in enumerate(digests) if digest not in previous]
+    fresh = dict(zip(missing, await asyncio.gather(*(summarize_chunk(chunks[i]) for i in missing))))
+    reused = len(spans) - len(missing)
+
+    records = [
+        (index, start, end, digests[index], PROMPT_VERSION, fresh.get(index) or previous[digests[index]])
+        for index, (start, end) in enumerate(spans)
+    ]
+
+    # A blank chunk summary would be reused forever, so only complete sets are stored.
+    if store and docid and records and all(r[5].strip() for r in records):
+        await save_case_chunks(docid, records)
+        print(f"[CHUNKS] docid={docid}: {len(records)} chunks, {reused} reused")
+    return records
+
+
+async def summarize_document(docid: Optional[str], text: str, store: bool = True) -> str:
+    records = await summarize_chunks(docid, text, store)
+    if not records:
+        return ""
+    if len(records) == 1:
+        return records[0][5]
+    # Only the reduce step runs again when nothing but the combine prompt changed.
+    return await combine_summaries([r[5] for r in records])
+
+
+async def relevance_from_chunks(query: str, summaries: List[str]) -> str:
+    """Relevance over chunk summaries of the whole document; the text itself is not re-read."""
+    sections = "\n".join(f"[Part {i + 1}] {summary}" for i, summary in enumerate(summaries))
+    return await hierarchical_relevance(query, sections, RELEVANCE_WINDOW_CHARS)
+
+
+async def relevance_for_case(docid: str, query: str, cached_summary: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Explain relevance of a case to a query.
+
+    Returns (explanation, summary), where summary is only set if the case had
+    to be summarized now and should be saved by the caller.
+    """
+    from utils.db import get_case_chunks
+    from utils.kanoon_api import fetch_case_by_docid
+
+    chunks = await get_case_chunks(docid)
+    if chunks:
+        return await relevance_from_chunks(query, [c["summary"] for c in chunks]), None
+
+    if cached_summary:
+        # Summarized before chunk records existed; fall back to the overall summary.
+        return await hierarchical_relevance(query, cached_summary), None
+
+    case = await fetch_case_by_docid(docid)
+    if "error" in case:
+        raise HTTPException(status_code=502, detail=f"Could not fetch case {docid}: {case['error']}")
+    case_text = case.get("text") or case.get("clean_doc", "")
+    records = await summarize_chunks(docid, case_text)
+    summaries = [r[5] for r in records]
+    if not summaries:
+        return "This case does not appear to be relevant to the user's query.", None
+    summary = summaries[0] if len(summaries) == 1 else await combine_summaries(summaries)
+    return await relevance_from_chunks(query, summaries), summary
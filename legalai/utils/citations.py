@@ -0,0 +1,50 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+from utils.keyword_extractor import ARTICLE_RE, CITATION_RES, SECTION_RE, normalize_section, normalize_statute
+
+# Links between judgments in Kanoon HTML look like <a href="/doc/1234567/">.
+DOC_LINK_RE = re.compile(r'href="/doc/(\d+)/?"')
+
+KIND_DOC = "doc"            # another Kanoon docid
+KIND_CITATION = "citation"  # reporter citation, e.g. AIR 1973 SC 1461
+KIND_STATUTE = "statute"    # Section 302 IPC / Article 21
+
+
+def extract_citations(docid: str, html_doc: str, clean_doc: str) -> List[Tuple[str, str]]:
+    """Return unique (kind, target) edges cited by a judgment."""
+    edges = set()
+
+    for target in DOC_LINK_RE.findall(html_doc or ""):
+        if target != docid:
+            edges.add((KIND_DOC, target))
+
+    text = clean_doc or ""
+    for pattern in CITATION_RES:
+        for m in pattern.finditer(text):
+            edges.add((KIND_CITATION, " ".join(m.group(0).split())))
+
+    for m in SECTION_RE.finditer(text):
+        statute = m.group(2)
+        # Bare "section 5" or "section 5 of the said Act" is too ambiguous to be a useful edge.
+        if statute:
+            edges.add((KIND_STATUTE, f"Section {normalize_section(m.group(1))} {normalize_statute(statute)}"))
+
+    for m in ARTICLE_RE.finditer(text):
+        edges.add((KIND_STATUTE, f"Article {m.group(1).replace(' ', '')}"))
+
+    return sorted(edges)
+
+
+async def index_case_citations(docid: str, doc: Dict[str, Any], force: bool = False):
+    """Extract and persist a fetched document's citations. Judgments don't change, so once is enough."""
+    from utils.db import is_citations_indexed, save_citations
+    if "error" in doc:
+        return
+    try:
+        if not force and await is_citations_indexed(docid):
+            return
+        edges = extract_citations(docid, doc.get("doc", ""), doc.get("clean_doc", ""))
+        await save_citations(docid, edges)
+    except Exception as e:
+        print(f"[CITATIONS] Indexing failed for docid={docid}: {e}")
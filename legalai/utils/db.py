@@ -1,84 +1,184 @@
 import asyncpg
 import os
+import time
 from dotenv import load_dotenv
+from utils.migrations import apply_migrations
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional streaming replica for reads. Unset means everything goes to the primary.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+# Set to "false" when migrations run as a separate release step (python -m utils.migrations).
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_QUERIES = int(os.getenv("DB_POOL_MAX_QUERIES", "50000"))
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", "300"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "5"))
+# asyncpg prepares and caches statements per connection. Set to 0 behind
+# PgBouncer in transaction mode, where prepared statements don't survive.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# After a write, that user's / document's reads stay on the primary this long.
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
 
 pool: asyncpg.pool.Pool = None
+read_pool: asyncpg.pool.Pool = None
+
+
+async def _create_pool(dsn: str):
+    return await asyncpg.create_pool(
+        dsn,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        max_queries=DB_POOL_MAX_QUERIES,
+        max_inactive_connection_lifetime=DB_POOL_MAX_INACTIVE_LIFETIME,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        timeout=DB_CONNECT_TIMEOUT,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+    )
 
 async def init_db():
-    global pool
-    pool = await asyncpg.create_pool(DATABASE_URL)
-    print("[DB] Connection pool created.")
+    global pool, read_pool
+    pool = await _create_pool(DATABASE_URL)
+    print(f"[DB] Connection pool created (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE}).")
 
-    async with pool.acquire() as conn:
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS case_meta (
-                docid TEXT PRIMARY KEY,
-                query TEXT,
-                modified_query TEXT,
-                summary TEXT
-            );
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                password_hash TEXT NOT NULL
-            );
-        """)
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS bookmarks (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                docid TEXT NOT NULL,
-                title TEXT,
-                court TEXT,
-                date TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, docid)
-            );
-        """)
-    print("[DB] Tables ensured.")
+    if RUN_MIGRATIONS_ON_STARTUP:
+        async with _acquire() as conn:
+            await apply_migrations(conn)
+
+    if DATABASE_REPLICA_URL:
+        read_pool = await _create_pool(DATABASE_REPLICA_URL)
+        print("[DB] Replica pool created.")
+    else:
+        read_pool = pool
+
+async def close_db():
+    global pool, read_pool
+    if read_pool and read_pool is not pool:
+        await read_pool.close()
+    if pool:
+        await pool.close()
+        print("[DB] Connection pool closed.")
+    pool = read_pool = None
+
+async def ping_db() -> bool:
+    if not pool:
+        return False
+    try:
+        async with pool.acquire(timeout=2) as conn:
+            return await conn.fetchval("SELECT 1") == 1
+    except Exception as e:
+        print(f"[DB] Ping failed: {e}")
+        return False
 
 async def get_pool():
     if not pool:
         raise RuntimeError("Database pool is not initialized. Call init_db() first.")
     return pool
 
+def get_read_pool():
+    if not read_pool:
+        raise RuntimeError("Database pool is not initialized. Call init_db() first.")
+    return read_pool
+
+def _pool_info(p: asyncpg.pool.Pool) -> dict:
+    return {
+        "size": p.get_size(),
+        "idle": p.get_idle_size(),
+        "min_size": p.get_min_size(),
+        "max_size": p.get_max_size(),
+    }
+
+def pool_stats() -> dict:
+    if not pool:
+        return {"primary": None, "replica": None}
+    return {
+        "primary": _pool_info(pool),
+        "replica": _pool_info(read_pool) if read_pool is not pool else None,
+        "recent_writers": len(_recent_writes),
+    }
+
+# ──────────────── Read/write routing ────────────────
+
+_recent_writes: dict = {}
+
+def _mark_write(*keys: str):
+    now = time.monotonic()
+    for key in keys:
+        _recent_writes[key] = now
+    if len(_recent_writes) > 10000:
+        cutoff = now - DB_READ_YOUR_WRITES_SECONDS
+        for key in [k for k, t in _recent_writes.items() if t < cutoff]:
+            del _recent_writes[key]
+
+def _reader(key: str) -> asyncpg.pool.Pool:
+    """Replica pool, unless `key` was written recently and the replica may lag."""
+    if read_pool is pool:
+        return pool
+    written = _recent_writes.get(key)
+    if written is not None and time.monotonic() - written < DB_READ_YOUR_WRITES_SECONDS:
+        return pool
+    return read_pool
+
+def _acquire(p: asyncpg.pool.Pool = None):
+    """Connection from `p` (default: the primary), waiting at most DB_ACQUIRE_TIMEOUT."""
+    return (p or pool).acquire(timeout=DB_ACQUIRE_TIMEOUT)
+
 # ──────────────── Case Meta ────────────────
 
 async def save_meta(docid: str, query: str, modified_query: str = None):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         await conn.execute("""
             INSERT INTO case_meta (docid, query, modified_query)
             VALUES ($1, $2, $3)
             ON CONFLICT (docid) DO UPDATE SET query = EXCLUDED.query, modified_query = EXCLUDED.modified_query
         """, docid, query, modified_query)
+        _mark_write(f"doc:{docid}")
         print(f"[DB] Meta saved for docid={docid}")
 
 async def get_meta(docid: str):
-    async with pool.acquire() as conn:
+    async with _acquire(_reader(f"doc:{docid}")) as conn:
         row = await conn.fetchrow("SELECT * FROM case_meta WHERE docid = $1", docid)
-        if row:
-            print(f"[DB] Meta fetched for docid={docid}")
-        else:
-            print(f"[DB] No meta found for docid={docid}")
-        return dict(row) if row else None
+    if row:
+        print(f"[DB] Meta fetched for docid={docid}")
+    else:
+        print(f"[DB] No meta found for docid={docid}")
+    return dict(row) if row else None
 
 async def save_summary(docid: str, summary: str):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         await conn.execute("""
             INSERT INTO case_meta (docid, summary)
             VALUES ($1, $2)
             ON CONFLICT (docid) DO UPDATE SET summary = EXCLUDED.summary
         """, docid, summary)
+        _mark_write(f"doc:{docid}")
         print(f"[DB] Summary saved for docid={docid}")
 
+async def save_summaries(rows: list):
+    """Bulk upsert of (docid, summary) pairs in one round-trip."""
+    async with _acquire() as conn:
+        await conn.executemany("""
+            INSERT INTO case_meta (docid, summary)
+            VALUES ($1, $2)
+            ON CONFLICT (docid) DO UPDATE SET summary = EXCLUDED.summary
+        """, rows)
+        _mark_write(*(f"doc:{docid}" for docid, _ in rows))
+        print(f"[DB] {len(rows)} summaries saved")
+
+async def get_summarized_docids(docids: list):
+    async with _acquire(read_pool) as conn:
+        rows = await conn.fetch("""
+            SELECT docid FROM case_meta
+            WHERE docid = ANY($1::text[]) AND summary IS NOT NULL
+        """, docids)
+        return {row["docid"] for row in rows}
+
 async def get_summary(docid: str):
-    async with pool.acquire() as conn:
+    async with _acquire(_reader(f"doc:{docid}")) as conn:
         row = await conn.fetchrow("SELECT summary FROM case_meta WHERE docid = $1", docid)
         if row:
             print(f"[DB] Summary fetched for docid={docid}")
@@ -86,57 +186,160 @@ async def get_summary(docid: str):
         print(f"[DB] No summary found for docid={docid}")
         return None
 
+async def save_query_rewrite(query: str, modified_query: str):
+    """Record an LLM keyword rewrite; the local extractor learns phrases from these."""
+    async with _acquire() as conn:
+        await conn.execute("""
+            INSERT INTO query_rewrites (query, modified_query)
+            VALUES ($1, $2)
+            ON CONFLICT (query) DO UPDATE SET modified_query = EXCLUDED.modified_query,
+                                              hits = query_rewrites.hits + 1,
+                                              updated_at = CURRENT_TIMESTAMP
+        """, query, modified_query)
+
+async def get_query_pairs(limit: int = 50000):
+    async with _acquire(read_pool) as conn:
+        rows = await conn.fetch("""
+            (SELECT query, modified_query FROM query_rewrites ORDER BY updated_at DESC LIMIT $1)
+            UNION ALL
+            (SELECT query, modified_query FROM case_meta
+             WHERE query IS NOT NULL AND modified_query IS NOT NULL
+             LIMIT $1)
+        """, limit)
+        print(f"[DB] Fetched {len(rows)} query pairs")
+        return [(row["query"], row["modified_query"]) for row in rows[:limit]]
+
+# ──────────────── Chunk summaries ────────────────
+
+async def get_case_chunks(docid: str):
+    async with _acquire(_reader(f"doc:{docid}")) as conn:
+        rows = await conn.fetch("""
+            SELECT chunk_index, start_offset, end_offset, chunk_hash, prompt_version, summary
+            FROM case_chunks
+            WHERE docid = $1
+            ORDER BY chunk_index
+        """, docid)
+        return [dict(row) for row in rows]
+
+async def save_case_chunks(docid: str, records: list):
+    """Replace a document's chunk records with (index, start, end, hash, prompt_version, summary) tuples."""
+    async with _acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("DELETE FROM case_chunks WHERE docid = $1", docid)
+            await conn.executemany("""
+                INSERT INTO case_chunks (docid, chunk_index, start_offset, end_offset, chunk_hash, prompt_version, summary)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+            """, [(docid, *record) for record in records])
+        _mark_write(f"doc:{docid}")
+        print(f"[DB] {len(records)} chunk summaries saved for docid={docid}")
+
+# ──────────────── Citations ────────────────
+
+async def save_citations(docid: str, edges: list):
+    async with _acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("""
+                INSERT INTO citation_sources (docid, edge_count)
+                VALUES ($1, $2)
+                ON CONFLICT (docid) DO UPDATE SET edge_count = EXCLUDED.edge_count, extracted_at = CURRENT_TIMESTAMP
+            """, docid, len(edges))
+            await conn.execute("DELETE FROM case_citations WHERE src_docid = $1", docid)
+            await conn.executemany("""
+                INSERT INTO case_citations (src_docid, kind, target) VALUES ($1, $2, $3)
+            """, [(docid, kind, target) for kind, target in edges])
+        _mark_write(f"doc:{docid}")
+        print(f"[DB] {len(edges)} citations saved for docid={docid}")
+
+async def is_citations_indexed(docid: str) -> bool:
+    async with _acquire(_reader(f"doc:{docid}")) as conn:
+        return await conn.fetchval("SELECT 1 FROM citation_sources WHERE docid = $1", docid) is not None
+
+async def get_cites(docid: str):
+    async with _acquire(_reader(f"doc:{docid}")) as conn:
+        rows = await conn.fetch("""
+            SELECT kind, target FROM case_citations
+            WHERE src_docid = $1
+            ORDER BY kind, target
+        """, docid)
+        return [dict(row) for row in rows]
+
+async def get_cited_by(docid: str, limit: int = 100):
+    async with _acquire(read_pool) as conn:
+        rows = await conn.fetch("""
+            SELECT src_docid FROM case_citations
+            WHERE kind = 'doc' AND target = $1
+            ORDER BY src_docid
+            LIMIT $2
+        """, docid, limit)
+        return [row["src_docid"] for row in rows]
+
+async def get_citation_counts(docids: list):
+    """In-degree of each docid across the whole local graph and within the given set."""
+    async with _acquire(read_pool) as conn:
+        rows = await conn.fetch("""
+            SELECT target AS docid,
+                   COUNT(*) AS cited_by,
+                   COUNT(*) FILTER (WHERE src_docid = ANY($1::text[])) AS cited_by_within
+            FROM case_citations
+            WHERE kind = 'doc' AND target = ANY($1::text[])
+            GROUP BY target
+        """, docids)
+        return {row["docid"]: {"cited_by": row["cited_by"], "cited_by_within": row["cited_by_within"]} for row in rows}
+
 # ──────────────── Users ────────────────
 
 async def get_user_by_email(email: str):
-    async with pool.acquire() as conn:
+    async with _acquire(_reader(f"email:{email}")) as conn:
         row = await conn.fetchrow("SELECT * FROM users WHERE email = $1", email)
         print(f"[DB] User lookup by email: {email} - {'Found' if row else 'Not found'}")
         return row
 
 async def get_user_by_id(user_id: int):
-    async with pool.acquire() as conn:
+    async with _acquire(_reader(f"user:{user_id}")) as conn:
         row = await conn.fetchrow("SELECT * FROM users WHERE id = $1", user_id)
-        print(f"[DB] User lookup by id: {user_id} - {'Found' if row else 'Not found'}")
-        return row
+    print(f"[DB] User lookup by id: {user_id} - {'Found' if row else 'Not found'}")
+    return row
 
 async def create_user(email: str, name: str, password_hash: str):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         user = await conn.fetchrow("""
             INSERT INTO users (email, name, password_hash)
             VALUES ($1, $2, $3)
             RETURNING id, email, name
         """, email, name, password_hash)
+        _mark_write(f"user:{user['id']}", f"email:{email}")
         print(f"[DB] New user created: {email}")
         return user
 
 # ──────────────── Bookmarks ────────────────
 
 async def add_bookmark(user_id: int, docid: str, title: str, court: str, date: str):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         await conn.execute("""
             INSERT INTO bookmarks (user_id, docid, title, court, date)
             VALUES ($1, $2, $3, $4, $5)
             ON CONFLICT (user_id, docid) DO NOTHING
         """, user_id, docid, title, court, date)
+        _mark_write(f"user:{user_id}")
         print(f"[DB] Bookmark added for user_id={user_id}, docid={docid}")
 
 async def get_user_bookmarks(user_id: int):
-    async with pool.acquire() as conn:
+    async with _acquire(_reader(f"user:{user_id}")) as conn:
         rows = await conn.fetch("""
             SELECT docid, title, court, date, created_at
             FROM bookmarks
             WHERE user_id = $1
             ORDER BY created_at DESC
         """, user_id)
-        print(f"[DB] Retrieved {len(rows)} bookmarks for user_id={user_id}")
-        return [dict(row) for row in rows]
+    print(f"[DB] Retrieved {len(rows)} bookmarks for user_id={user_id}")
+    return [dict(row) for row in rows]
 
 async def delete_bookmark(user_id: int, docid: str):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         result = await conn.execute("""
             DELETE FROM bookmarks
             WHERE user_id = $1 AND docid = $2
         """, user_id, docid)
+        _mark_write(f"user:{user_id}")
         print(f"[DB] Bookmark deleted for user_id={user_id}, docid={docid}")
         return result
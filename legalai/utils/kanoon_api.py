@@ -1,65 +1,160 @@
+import asyncio
 import httpx
 import os
 from dotenv import load_dotenv
-from typing import Dict, Any
-from bs4 import BeautifulSoup
+from typing import Dict, Any, List, Optional
 
 load_dotenv()
 
 API_KEY = os.getenv("INDIAN_KANOON_API_KEY")
 BASE_URL = "https://api.indiankanoon.org/search/"
+SEARCH_PAGE_URL = "https://indiankanoon.org/search/"
+# Search-API params that the public site only understands as inline query operators.
+SCRAPE_QUERY_OPERATORS = ("doctypes", "title", "cite", "author", "bench")
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared client, created on first request so connections are pooled across calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(follow_redirects=True, timeout=10.0)
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
 
 def clean_html_doc(html_doc: str) -> str:
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html_doc, "html.parser")
     clean_text = soup.get_text(separator="\n")
     clean_text = "\n".join(line.strip() for line in clean_text.splitlines() if line.strip())
     return clean_text
 
+# Large text fields on a /doc payload; everything else is case metadata.
+DOC_TEXT_FIELDS = ("doc", "clean_doc")
+DOC_FIELD_PRESETS = {
+    "meta": (),
+    "clean": ("clean_doc",),
+    "raw": ("doc",),
+}
+
+def project_case(data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the requested fields. Presets (meta/clean/raw) expand to metadata plus that text field."""
+    if not fields or "error" in data:
+        return data
+
+    keep = set()
+    include_meta = False
+    for field in fields:
+        if field in DOC_FIELD_PRESETS:
+            include_meta = True
+            keep.update(DOC_FIELD_PRESETS[field])
+        else:
+            keep.add(field)
+
+    return {
+        key: value for key, value in data.items()
+        if key in keep or (include_meta and key not in DOC_TEXT_FIELDS)
+    }
+
+def slice_text(text: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Return a window of text ending on a line boundary where possible, plus the offset to resume from."""
+    total = len(text)
+    offset = min(max(offset, 0), total)
+    end = total if limit is None else min(offset + limit, total)
+
+    if end < total:
+        newline = text.rfind("\n", offset, end)
+        if newline > offset:
+            end = newline + 1
+
+    return {
+        "text": text[offset:end],
+        "offset": offset,
+        "next_offset": end if end < total else None,
+        "total_chars": total,
+    }
+
 async def fetch_cases(params: Dict[str, Any]) -> Dict[str, Any]:
     headers = {
         "Authorization": f"Token {API_KEY}",
         "Accept": "application/json"
     }
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-        try:
-            response = await client.post(BASE_URL, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data
-
-        except httpx.HTTPStatusError as e:
-            print(f"HTTP ERROR: {e.response.status_code} - {e.response.text}")
-            return {"error": f"HTTP error {e.response.status_code}: {e.response.text}"}
-        except httpx.RequestError as e:
-            print(f"Request ERROR: {e}")
-            return {"error": f"Request error: {str(e)}"}
-        except Exception as e:
-            print(f"General ERROR: {e}")
-            return {"error": f"Unexpected error: {str(e)}"}
-
-async def fetch_case_by_docid(docid: str) -> Dict[str, Any]:
+    client = get_http_client()
+    try:
+        response = await client.post(BASE_URL, headers=headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+        return data
+
+    except httpx.HTTPStatusError as e:
+        print(f"HTTP ERROR: {e.response.status_code} - {e.response.text}")
+        return {"error": f"HTTP error {e.response.status_code}: {e.response.text}"}
+    except httpx.RequestError as e:
+        print(f"Request ERROR: {e}")
+        return {"error": f"Request error: {str(e)}"}
+    except Exception as e:
+        print(f"General ERROR: {e}")
+        return {"error": f"Unexpected error: {str(e)}"}
+
+async def fetch_case_by_docid(docid: str, clean: bool = True) -> Dict[str, Any]:
     url = f"https://api.indiankanoon.org/doc/{docid}/"
     headers = {
         "Authorization": f"Token {API_KEY}",
         "Accept": "application/json"
     }
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-        try:
-            response = await client.post(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+    client = get_http_client()
+    try:
+        response = await client.post(url, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+
+        # Clean the 'doc' HTML field if present
+        if clean and "doc" in data:
+            data["clean_doc"] = clean_html_doc(data["doc"])
+
+        return data
+
+    except httpx.HTTPStatusError as e:
+        return {"error": f"HTTP error {e.response.status_code}: {e.response.text}"}
+    except httpx.RequestError as e:
+        return {"error": f"Request error: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Unexpected error: {str(e)}"}
+
+async def fetch_cases_html(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Fallback search that scrapes the public results page into the fetch_cases shape."""
+    from utils.parse_cases_from_html import parse_search_page, to_search_response
 
-            # Clean the 'doc' HTML field if present
-            if "doc" in data:
-                data["clean_doc"] = clean_html_doc(data["doc"])
+    form_input = params.get("formInput", "")
+    for key in SCRAPE_QUERY_OPERATORS:
+        if params.get(key):
+            form_input += f" {key}: {params[key]}"
 
-            return data
+    client = get_http_client()
+    try:
+        response = await client.get(
+            SEARCH_PAGE_URL,
+            params={"formInput": form_input, "pagenum": params.get("pagenum", "0")},
+            headers={"Accept": "text/html"},
+        )
+        response.raise_for_status()
+        # Parsing is CPU-bound; keep it off the event loop.
+        page = await asyncio.to_thread(parse_search_page, response.text)
+        return to_search_response(page)
 
-        except httpx.HTTPStatusError as e:
-            return {"error": f"HTTP error {e.response.status_code}: {e.response.text}"}
-        except httpx.RequestError as e:
-            return {"error": f"Request error: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
+    except httpx.HTTPStatusError as e:
+        print(f"Scrape HTTP ERROR: {e.response.status_code}")
+        return {"error": f"HTTP error {e.response.status_code}"}
+    except httpx.RequestError as e:
+        print(f"Scrape Request ERROR: {e}")
+        return {"error": f"Request error: {str(e)}"}
+    except Exception as e:
+        print(f"Scrape General ERROR: {e}")
+        return {"error": f"Unexpected error: {str(e)}"}
@@ -0,0 +1,240 @@
+import os
+import re
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+# Words that carry no search value in an Indian Kanoon query. Kept deliberately
+# broad: Kanoon does its own stemming, so dropping filler only sharpens results.
+LEGAL_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few find for from further
+get give had has have having he her here hers him his how i if in into is it its itself just
+know let like look looking me more most my need no nor not now of off on once only or other our
+out over own please related relating regarding relevant same she should show so some such tell
+than that the their them then there these they this those through to too under until up upon
+us very want was we were what when where whether which while who whom why will with without would you
+your yours
+
+case cases judgment judgments judgement order orders court courts india indian law laws legal
+matter matters issue issues question questions held hold ruling rulings decided decision
+decisions precedent precedents example examples any latest recent landmark important famous
+person someone somebody man woman party parties file filed filing can't cannot act acts
+""".split())
+
+STATUTE_ABBREVIATIONS = {
+    "indian penal code": "IPC",
+    "code of criminal procedure": "CrPC",
+    "criminal procedure code": "CrPC",
+    "code of civil procedure": "CPC",
+    "civil procedure code": "CPC",
+    "indian evidence act": "Evidence Act",
+    "negotiable instruments act": "NI Act",
+    "bharatiya nyaya sanhita": "BNS",
+    "bharatiya nagarik suraksha sanhita": "BNSS",
+    "bharatiya sakshya adhiniyam": "BSA",
+    "cr.p.c.": "CrPC",
+    "cr.p.c": "CrPC",
+    "c.p.c.": "CPC",
+    "c.p.c": "CPC",
+    "ipc": "IPC",
+    "crpc": "CrPC",
+    "cpc": "CPC",
+}
+
+_STATUTE_ALT = "|".join(
+    sorted(
+        # Judgment text wraps lines anywhere, including inside a statute name.
+        [re.escape(name).replace("\\ ", r"\s+") for name in STATUTE_ABBREVIATIONS]
+        + ["BNS", "BNSS", "BSA", "NDPS Act", "NI Act", "Evidence Act"],
+        key=len,
+        reverse=True,
+    )
+    # Generic "<Name> Act[, 1956]" last so specific names win. Case-sensitive
+    # even though SECTION_RE is not: only Capitalised Words form an Act name,
+    # otherwise "section 302 and the arms act" swallows "and the arms".
+    # Single lowercase connectors are allowed between words ("Prevention of
+    # Corruption Act", "Arbitration and Conciliation Act").
+    + [r"(?-i:(?!(?:The|This|That|Said|Such|Same|Principal|Parent|Amending|Above)\b)"
+       r"(?!Act\b)[A-Z][A-Za-z]+(?:(?:\s+(?:of|and|for|the|from))?\s+(?!Act\b)[A-Z][A-Za-z]+){0,5}"
+       r"\s+Act(?:,?\s+\d{4})?)"]
+)
+
+SECTION_RE = re.compile(
+    r"\b(?:sections?|secs?\.?|s\.|u/s\.?)\s*"
+    r"(\d+[A-Z]{0,2}(?:\s*\([0-9a-z]{1,4}\))*)"  # 13(1)(ia)
+    r"(?:\s*(?:of\s+(?:the\s+)?)?(" + _STATUTE_ALT + r"))?",
+    re.IGNORECASE,
+)
+
+_ACT_YEAR_RE = re.compile(r",?\s+\d{4}$")
+
+
+def normalize_section(number: str) -> str:
+    """Canonical section number: no spaces, letter suffix uppercased (498a -> 498A, 13(1)(ia) kept)."""
+    number = number.replace(" ", "")
+    head = re.match(r"\d+[A-Za-z]*", number).group(0)
+    return head.upper() + number[len(head):]
+
+
+def normalize_statute(name: str) -> str:
+    """Canonical statute name: whitespace collapsed, abbreviated, year dropped."""
+    name = " ".join(name.split())
+    name = STATUTE_ABBREVIATIONS.get(name.lower(), name)
+    return _ACT_YEAR_RE.sub("", name)
+
+
+ARTICLE_RE = re.compile(r"\b(?:article|art\.)\s*(\d+[A-Z]?(?:\s*\(\d+\))*)(?:\s*of\s+the\s+constitution)?", re.IGNORECASE)
+CITATION_RES = [
+    re.compile(r"\bAIR\s+\d{4}\s+[A-Z][A-Za-z]*\s+\d+\b"),              # AIR 1973 SC 1461
+    re.compile(r"\(\d{4}\)\s+\d+\s+SCC\s+\d+\b"),                        # (2014) 8 SCC 273
+    re.compile(r"\b\d{4}\s+(?:SCC|SCR|SCALE|Cri\s?LJ)\s+(?:\(\w+\)\s+)?\d+\b"),
+    re.compile(r"\b\d{4}\s+INSC\s+\d+\b"),
+]
+
+# Seed phrases; extended at runtime from past query -> modified_query pairs.
+SEED_PHRASES = [
+    "anticipatory bail", "regular bail", "default bail", "dowry death", "dowry harassment",
+    "cheque bounce", "cheque dishonour", "domestic violence", "specific performance",
+    "writ petition", "habeas corpus", "public interest litigation", "right to privacy",
+    "right to life", "personal liberty", "freedom of speech", "natural justice",
+    "res judicata", "adverse possession", "burden of proof", "benefit of doubt",
+    "circumstantial evidence", "dying declaration", "culpable homicide", "criminal breach of trust",
+    "criminal conspiracy", "sexual harassment", "motor accident", "land acquisition",
+    "arbitration award", "consumer complaint", "medical negligence", "divorce by mutual consent",
+    "restitution of conjugal rights", "maintenance to wife", "child custody", "eviction of tenant",
+    "service matter", "wrongful termination", "quashing of fir", "transfer petition",
+    "contempt of court", "basic structure", "reservation in promotion", "triple talaq",
+]
+
+# LLM rewriting is only attempted below this confidence; set KEYWORD_LLM_FALLBACK=false to disable.
+KEYWORD_LLM_FALLBACK = os.getenv("KEYWORD_LLM_FALLBACK", "true").lower() == "true"
+KEYWORD_MIN_CONFIDENCE = float(os.getenv("KEYWORD_MIN_CONFIDENCE", "0.5"))
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'/.-]*")
+MAX_PHRASE_WORDS = 4
+
+
+def _tokens(text: str) -> List[str]:
+    return [t.strip(".'").lower() for t in _TOKEN_RE.findall(text) if t.strip(".'")]
+
+
+class KeywordExtractor:
+    def __init__(self, phrases: Iterable[str] = SEED_PHRASES):
+        self.phrases = set()
+        self.add_phrases(phrases)
+
+    def add_phrases(self, phrases: Iterable[str]):
+        for phrase in phrases:
+            words = tuple(_tokens(phrase))
+            if 2 <= len(words) <= MAX_PHRASE_WORDS:
+                self.phrases.add(words)
+
+    def learn_from_pairs(self, pairs: Iterable[Tuple[str, Optional[str]]], min_count: int = 2):
+        """Mine phrases that users typed and the LLM kept verbatim in modified_query."""
+        counts = Counter()
+        for query, modified in pairs:
+            if not query or not modified:
+                continue
+            q_words, m_text = _tokens(query), " " + " ".join(_tokens(modified)) + " "
+            seen = set()
+            for n in range(2, MAX_PHRASE_WORDS + 1):
+                for i in range(len(q_words) - n + 1):
+                    gram = tuple(q_words[i:i + n])
+                    if gram[0] in LEGAL_STOPWORDS or gram[-1] in LEGAL_STOPWORDS:
+                        continue
+                    if gram not in seen and f" {' '.join(gram)} " in m_text:
+                        seen.add(gram)
+                        counts[gram] += 1
+        learned = [gram for gram, count in counts.items() if count >= min_count]
+        self.phrases.update(learned)
+        return len(learned)
+
+    def extract(self, text: str) -> Tuple[List[str], float]:
+        """Return (keywords, confidence in [0, 1])."""
+        keywords = []
+        anchored = 0  # statutes, citations and known phrases
+
+        def take(match):
+            nonlocal anchored
+            anchored += 1
+            keywords.append(match)
+            return " "
+
+        for pattern in CITATION_RES:
+            text = pattern.sub(lambda m: take(" ".join(m.group(0).split())), text)
+
+        def section(m):
+            statute = normalize_statute(m.group(2) or "")
+            return take(f"Section {normalize_section(m.group(1))} {statute}".strip())
+
+        text = SECTION_RE.sub(section, text)
+        text = ARTICLE_RE.sub(lambda m: take(f"Article {m.group(1).replace(' ', '')}"), text)
+
+        words = _tokens(text)
+        content_words = 0
+        i = 0
+        while i < len(words):
+            for n in range(min(MAX_PHRASE_WORDS, len(words) - i), 1, -1):
+                gram = tuple(words[i:i + n])
+                if gram in self.phrases:
+                    keywords.append(" ".join(gram))
+                    anchored += 1
+                    content_words += 1
+                    i += n
+                    break
+            else:
+                word = words[i]
+                if word not in LEGAL_STOPWORDS and (len(word) > 2 or word.isdigit()):
+                    keywords.append(word)
+                    content_words += 1
+                i += 1
+
+        # Dedupe, case-insensitively, keeping first occurrence.
+        seen, unique = set(), []
+        for kw in keywords:
+            if kw.lower() not in seen:
+                seen.add(kw.lower())
+                unique.append(kw)
+
+        if not unique:
+            return [], 0.0
+        if anchored:
+            confidence = min(1.0, 0.6 + 0.2 * anchored)
+        else:
+            # Short keyword-style queries need no rewriting; long prose probably does.
+            confidence = 0.8 if content_words <= 3 else max(0.2, 0.8 - 0.1 * (content_words - 3))
+        return unique, confidence
+
+
+extractor = KeywordExtractor()
+
+
+async def load_phrases_from_db(limit: int = 50000) -> int:
+    from utils.db import get_query_pairs
+    pairs = await get_query_pairs(limit)
+    learned = extractor.learn_from_pairs(pairs)
+    print(f"[KEYWORDS] Learned {learned} phrases from {len(pairs)} past queries")
+    return learned
+
+
+async def extract_search_keywords(query: str) -> Tuple[List[str], str, bool]:
+    """Local extraction first; the LLM only for low-confidence queries when it has budget.
+
+    Returns (keywords, source, degraded): source is "local" or "llm", and
+    degraded is True when the LLM fallback was wanted but skipped or failed.
+    """
+    keywords, confidence = extractor.extract(query)
+    if confidence >= KEYWORD_MIN_CONFIDENCE or not KEYWORD_LLM_FALLBACK:
+        return keywords, "local", False
+
+    from utils.sambonva_utils import SAMBA_API_KEY, extract_keywords, llm_saturated
+    if not SAMBA_API_KEY:
+        # call_sambonva would answer with an error message, not keywords.
+        return keywords, "local", False
+    if llm_saturated():
+        return keywords, "local", True
+    try:
+        return await extract_keywords(query), "llm", False
+    except RuntimeError as e:
+        print(f"[KEYWORDS] LLM fallback failed, using local keywords: {e}")
+        return keywords, "local", True
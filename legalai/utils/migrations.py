@@ -0,0 +1,128 @@
+import asyncio
+import asyncpg
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Append-only. Never edit a migration that has shipped; add a new version instead.
+MIGRATIONS = [
+    (1, "initial schema", """
+        CREATE TABLE IF NOT EXISTS case_meta (
+            docid TEXT PRIMARY KEY,
+            query TEXT,
+            modified_query TEXT,
+            summary TEXT
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            email TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            password_hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS bookmarks (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            docid TEXT NOT NULL,
+            title TEXT,
+            court TEXT,
+            date TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, docid)
+        );
+    """),
+    (2, "citation graph", """
+        CREATE TABLE IF NOT EXISTS citation_sources (
+            docid TEXT PRIMARY KEY,
+            edge_count INTEGER NOT NULL DEFAULT 0,
+            extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS case_citations (
+            src_docid TEXT NOT NULL REFERENCES citation_sources(docid) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            target TEXT NOT NULL,
+            PRIMARY KEY (src_docid, kind, target)
+        );
+        CREATE INDEX IF NOT EXISTS case_citations_target_idx ON case_citations (kind, target);
+    """),
+    (3, "per-chunk summaries", """
+        CREATE TABLE IF NOT EXISTS case_chunks (
+            docid TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            chunk_hash TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (docid, chunk_index)
+        );
+    """),
+    (4, "llm query rewrites", """
+        CREATE TABLE IF NOT EXISTS query_rewrites (
+            query TEXT PRIMARY KEY,
+            modified_query TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Arbitrary constant so concurrent instances don't migrate at the same time.
+MIGRATION_LOCK_ID = 72_417_001
+
+
+async def current_version(conn) -> int:
+    exists = await conn.fetchval("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not exists:
+        return 0
+    return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+
+
+async def apply_migrations(conn) -> int:
+    """Apply pending migrations. The common case (schema up to date) costs a single round-trip."""
+    if await current_version(conn) >= LATEST_VERSION:
+        print(f"[DB] Schema up to date (v{LATEST_VERSION}).")
+        return 0
+
+    applied = 0
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        # Re-read under the lock in case another instance just finished.
+        version = await current_version(conn)
+        for number, name, sql in MIGRATIONS:
+            if number <= version:
+                continue
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", number, name
+                )
+            applied += 1
+            print(f"[DB] Applied migration v{number}: {name}")
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+    return applied
+
+
+async def main():
+    conn = await asyncpg.connect(os.getenv("DATABASE_URL"))
+    try:
+        applied = await apply_migrations(conn)
+        print(f"[DB] {applied} migration(s) applied.")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    # python -m utils.migrations
+    asyncio.run(main())
@@ -1,31 +1,161 @@
-from bs4 import BeautifulSoup
-from typing import List, Dict
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
 
-def parse_search_results(html: str) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    results = []
+DOCID_RE = re.compile(r"/doc(?:fragment)?/(\d+)")
+FOUND_RE = re.compile(r"\d[\d,]*\s*-\s*\d[\d,]*\s+of\s+\d[\d,]*")
+CITEDBY_RE = re.compile(r"Cited by\s+(\d[\d,]*)", re.IGNORECASE)
+# Result titles end with the judgment date: "State Of Punjab vs Ajaib Singh on 12 March, 2019".
+TITLE_DATE_RE = re.compile(r"\bon\s+(\d{1,2}\s+[A-Za-z]+,?\s+\d{4})\s*$")
 
-    for div in soup.find_all("div", class_="result"):
-        title_tag = div.find("a")
-        if not title_tag:
-            continue
+# Start of a result block, located with the C regex engine so the page chrome
+# around results (nav, scripts, footers) is never tokenized at all.
+RESULT_START_RE = re.compile(r"""<(?:div|article)\b[^>]*\bclass\s*=\s*["'](?:[^"']*\s)?result(?:\s[^"']*)?["']""", re.IGNORECASE)
+# The last block has no following start to bound it; feed it in slices until it closes.
+FEED_CHUNK = 8 * 1024
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class _SearchResultParser(HTMLParser):
+    """Event-driven extractor for Kanoon result blocks.
+
+    Only text inside a <div class="result"> (or <article class="result">) is buffered, and only for the
+    fields we keep; nothing else on the page is retained, so memory is bounded
+    by the size of one result block rather than the whole DOM.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.results: List[Dict] = []
+        self._depth = 0          # element depth inside the current result div, 0 = outside
+        self._current: Optional[Dict] = None
+        self._field: Optional[str] = None
+        self._field_depth = 0
+        self._buf: Dict[str, List[str]] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if self._depth and self._is_result(tag, attrs):
+            # Unclosed tags inflated the depth; a new result block means the old one is over.
+            self._finish_result()
+            self._depth = 0
+        if self._depth:
+            if tag not in VOID_TAGS:
+                self._depth += 1
+            attrs = dict(attrs)
+            classes = (attrs.get("class") or "").split()
+            if tag == "a" and self._current.get("href") is None and attrs.get("href"):
+                self._current["href"] = attrs["href"]
+                self._start_field("title")
+            elif tag == "span" and "docsource" in classes:
+                self._start_field("court_info")
+            elif (tag == "p" and "snippet" in classes) or (tag == "div" and "headline" in classes):
+                self._start_field("summary")
+            elif tag == "a" and "cite_tag" in classes:
+                self._start_field("cite_tag")
+            return
+
+        if self._is_result(tag, attrs):
+            self._depth = 1
+            self._current = {"href": None}
+            self._buf = {}
+
+    def handle_endtag(self, tag):
+        if not self._depth or tag in VOID_TAGS:
+            return
+        self._depth -= 1
+        if self._field and self._depth < self._field_depth:
+            self._field = None
+        if self._depth == 0:
+            self._finish_result()
+
+    def handle_data(self, data):
+        if self._field:
+            self._buf.setdefault(self._field, []).append(data)
+
+    @staticmethod
+    def _is_result(tag, attrs) -> bool:
+        return tag in ("div", "article") and "result" in (dict(attrs).get("class") or "").split()
 
-        title = title_tag.text.strip()
-        href = title_tag["href"]
-        docid = href.split("/")[-2] if href else None
+    @property
+    def in_result(self) -> bool:
+        return self._depth > 0
 
-        court_info_tag = div.find("span", class_="docsource")
-        court_info = court_info_tag.text.strip() if court_info_tag else ""
+    def _start_field(self, name: str):
+        # Fields don't nest; the outermost one wins.
+        if not self._field:
+            self._field = name
+            self._field_depth = self._depth
 
-        snippet = div.find("p", class_="snippet")
-        summary = snippet.text.strip() if snippet else ""
+    def _text(self, name: str) -> str:
+        return " ".join("".join(self._buf.get(name, [])).split())
 
-        results.append({
+    def _finish_result(self):
+        href = self._current.get("href")
+        self._field = None
+        if not href:
+            return
+        m = DOCID_RE.search(href)
+        cited = CITEDBY_RE.search(self._text("cite_tag"))
+        title = self._text("title")
+        self.results.append({
             "title": title,
-            "docid": docid,
+            "docid": m.group(1) if m else None,
             "url": f"https://indiankanoon.org{href}",
-            "court_info": court_info,
-            "summary": summary,
+            "court_info": self._text("court_info"),
+            "summary": self._text("summary"),
+            "numcitedby": int(cited.group(1).replace(",", "")) if cited else None,
+            "publishdate": _title_date(title),
         })
 
-    return results
+
+def _title_date(title: str) -> Optional[str]:
+    """ISO date from a result title, matching the API's publishdate; None if absent."""
+    m = TITLE_DATE_RE.search(title)
+    if not m:
+        return None
+    try:
+        return datetime.strptime(m.group(1).replace(",", ""), "%d %B %Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def parse_search_results(html: str) -> List[Dict]:
+    return parse_search_page(html)["results"]
+
+
+def parse_search_page(html: str) -> Dict:
+    starts = [m.start() for m in RESULT_START_RE.finditer(html)]
+    found = FOUND_RE.search(html, 0, starts[0] if starts else len(html))
+
+    parser = _SearchResultParser()
+    for i, start in enumerate(starts[:-1]):
+        parser.feed(html[start:starts[i + 1]])
+    if starts:
+        pos = starts[-1]
+        while pos < len(html):
+            parser.feed(html[pos:pos + FEED_CHUNK])
+            pos += FEED_CHUNK
+            if not parser.in_result:
+                break
+    parser.close()
+    return {"found": found.group(0) if found else "", "results": parser.results}
+
+
+def to_search_response(page: Dict) -> Dict:
+    """Reshape a scraped page like the JSON search API response (found + docs)."""
+    docs = []
+    for r in page["results"]:
+        if not r["docid"]:
+            continue
+        docs.append({
+            "tid": int(r["docid"]),
+            "title": r["title"],
+            "docsource": r["court_info"],
+            "headline": r["summary"],
+            "fragment": r["summary"],  # the UI reads `fragment`
+            "numcitedby": r["numcitedby"],
+            "publishdate": r["publishdate"],
+        })
+    return {"found": page["found"], "docs": docs, "source": "scrape"}
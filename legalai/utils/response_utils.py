@@ -0,0 +1,63 @@
+import asyncio
+import gzip
+import os
+from typing import Any
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Bodies at least this large are serialized and compressed in a worker thread,
+# so a multi-megabyte judgment doesn't stall every other request on the loop.
+OFFLOAD_MIN_BYTES = int(os.getenv("OFFLOAD_MIN_BYTES", str(256 * 1024)))
+
+
+def _accepted_encodings(request: Request) -> set[str]:
+    header = request.headers.get("accept-encoding", "")
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def _encode(payload: Any, encodings: set[str]) -> tuple[bytes, dict]:
+    body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    headers = {"Vary": "Accept-Encoding"}
+
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if brotli is not None and "br" in encodings:
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in encodings:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def _approx_size(payload: Any) -> int:
+    # Size of the top-level string fields (clean_doc, doc); avoids serializing twice to measure.
+    if isinstance(payload, dict):
+        return sum(len(v) for v in payload.values() if isinstance(v, str))
+    return 0
+
+
+async def json_response(request: Request, payload: Any, status_code: int = 200) -> Response:
+    """Serialize with orjson and compress (br > gzip) when the body is large enough."""
+    encodings = _accepted_encodings(request)
+    if _approx_size(payload) >= OFFLOAD_MIN_BYTES:
+        body, headers = await asyncio.to_thread(_encode, payload, encodings)
+    else:
+        body, headers = _encode(payload, encodings)
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -2,8 +2,8 @@ import os
 import asyncio
 import math
 import time
-from openai import OpenAI
 from dotenv import load_dotenv
+from utils.admission import PriorityGate, current_priority
 
 load_dotenv()
 
@@ -12,46 +12,115 @@ SAMBA_BASE_URL = "https://api.sambanova.ai/v1"
 SAMBA_MODEL = "Llama-4-Maverick-17B-128E-Instruct"
 SAMBA_DELAY = float(os.getenv("SAMBA_DELAY", "2.0"))
 MAX_TOKENS_PER_SUMMARY = 3000
-SAMBA_CHUNK_LIMIT_PER_MIN = 40
-
-client = OpenAI(
-    api_key=SAMBA_API_KEY,
-    base_url=SAMBA_BASE_URL,
-)
+SAMBA_CHUNK_LIMIT_PER_MIN = int(os.getenv("SAMBA_CALLS_PER_MIN", "40"))
+SAMBA_MAX_CONCURRENCY = int(os.getenv("SAMBA_MAX_CONCURRENCY", "4"))
+# Waiters on the LLM gate beyond which /search skips keyword extraction.
+SAMBA_SATURATION_QUEUE = int(os.getenv("SAMBA_SATURATION_QUEUE", "8"))
+
+_client = None
+
+
+def get_client():
+    """Build the OpenAI-compatible client on first use so importing this module stays cheap."""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(
+            api_key=SAMBA_API_KEY,
+            base_url=SAMBA_BASE_URL,
+        )
+    return _client
 
 SAMBA_CALLS_THIS_MINUTE = 0
 SAMBA_LAST_MINUTE = time.time()
 
 
-async def call_sambonva(prompt: str, max_tokens: int = 256, temperature: float = 0.3) -> str:
-    if not SAMBA_API_KEY:
-        return "SambaNova API key not found."
+llm_gate = PriorityGate(SAMBA_MAX_CONCURRENCY)
+# Callers waiting for per-minute budget queue here, by priority, without holding an llm_gate slot.
+budget_gate = PriorityGate(1)
 
-    await asyncio.sleep(SAMBA_DELAY)
 
-    try:
-        response = client.chat.completions.create(
-            model=SAMBA_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=max_tokens,
-            temperature=temperature,
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        raise RuntimeError(f"SambaNova API call failed: {e}")
+# Running average of one LLM call, slot to return, for admission wait estimates.
+_avg_call_s = SAMBA_DELAY + 3.0
 
 
-async def rate_limited_call_sambonva(*args, **kwargs):
+def budget_wait_seconds() -> float:
+    """Seconds until the per-minute SambaNova budget has room for another call."""
+    elapsed = time.time() - SAMBA_LAST_MINUTE
+    if elapsed >= 60 or SAMBA_CALLS_THIS_MINUTE < SAMBA_CHUNK_LIMIT_PER_MIN:
+        return 0.0
+    return 60 - elapsed
+
+
+def llm_wait_seconds() -> float:
+    """Estimated wait before a newly queued LLM call starts: gate backlog plus budget."""
+    wait = budget_wait_seconds()
+    backlog = llm_gate.waiting + budget_gate.waiting
+    if llm_gate.active >= llm_gate.limit:
+        wait += math.ceil((backlog + 1) / llm_gate.limit) * _avg_call_s
+    window_left = 60 - (time.time() - SAMBA_LAST_MINUTE)
+    if window_left > 0 and backlog >= SAMBA_CHUNK_LIMIT_PER_MIN - SAMBA_CALLS_THIS_MINUTE:
+        # The queue alone uses up this minute's budget; we start in a later window.
+        wait = max(wait, window_left + 60 * (backlog // SAMBA_CHUNK_LIMIT_PER_MIN))
+    return wait
+
+
+def llm_saturated() -> bool:
+    return budget_wait_seconds() > 0 or llm_gate.waiting >= SAMBA_SATURATION_QUEUE
+
+
+def _try_reserve_budget() -> bool:
+    # No await between the check and the increment, so concurrent callers can't both take the last call.
     global SAMBA_CALLS_THIS_MINUTE, SAMBA_LAST_MINUTE
     now = time.time()
-    if now - SAMBA_LAST_MINUTE > 60:
+    if now - SAMBA_LAST_MINUTE >= 60:
         SAMBA_CALLS_THIS_MINUTE = 0
         SAMBA_LAST_MINUTE = now
     if SAMBA_CALLS_THIS_MINUTE >= SAMBA_CHUNK_LIMIT_PER_MIN:
-        await asyncio.sleep(60 - (now - SAMBA_LAST_MINUTE))
-        SAMBA_CALLS_THIS_MINUTE = 0
-        SAMBA_LAST_MINUTE = time.time()
+        return False
     SAMBA_CALLS_THIS_MINUTE += 1
+    return True
+
+
+async def _reserve_budget(priority: int = None):
+    """Take one call from the per-minute budget, sleeping until the next window if it's spent."""
+    if priority is None:
+        priority = current_priority.get()
+    async with budget_gate.slot(priority):
+        while not _try_reserve_budget():
+            await asyncio.sleep(max(budget_wait_seconds(), 0.05))
+
+
+async def call_sambonva(prompt: str, max_tokens: int = 256, temperature: float = 0.3) -> str:
+    global _avg_call_s
+    if not SAMBA_API_KEY:
+        return "SambaNova API key not found."
+
+    # Interactive requests jump ahead of background summaries for both the
+    # per-minute budget and the concurrency slot. Budget is reserved first, so
+    # nobody sleeps on the budget while holding a slot.
+    priority = current_priority.get()
+    await _reserve_budget(priority)
+    async with llm_gate.slot(priority):
+        start = time.monotonic()
+        await asyncio.sleep(SAMBA_DELAY)
+        try:
+            response = await asyncio.to_thread(
+                get_client().chat.completions.create,
+                model=SAMBA_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            raise RuntimeError(f"SambaNova API call failed: {e}")
+        finally:
+            _avg_call_s = 0.8 * _avg_call_s + 0.2 * (time.monotonic() - start)
+
+
+async def rate_limited_call_sambonva(*args, **kwargs):
+    # Budget accounting now lives in call_sambonva; kept for existing callers.
     return await call_sambonva(*args, **kwargs)
 
 
@@ -90,14 +159,29 @@ def chunk_text(text: str, max_chars: int = MAX_TOKENS_PER_SUMMARY) -> list[str]:
     return chunks
 
 
+# Map-stage prompt. Stored chunk summaries are tagged with a hash of this text,
+# so editing it invalidates them automatically.
+CHUNK_SUMMARY_PROMPT = (
+    "Summarize the following portion of a legal document in 2-3 sentences. "
+    "Do not repeat the user's query or use introductory phrases. "
+    "Focus only on the main legal findings and outcomes:\n\n"
+)
+
+
 async def summarize_chunk(chunk: str) -> str:
-    prompt = (
-        "Summarize the following portion of a legal document in 2-3 sentences. "
-        "Do not repeat the user's query or use introductory phrases. "
-        "Focus only on the main legal findings and outcomes:\n\n"
-        f"{chunk}"
+    return await call_sambonva(CHUNK_SUMMARY_PROMPT + chunk, max_tokens=256)
+
+
+async def combine_summaries(summaries: list[str]) -> str:
+    combined_summary = "\n".join(summaries)
+    final_prompt = (
+        "You are a legal assistant. Based on the following section-wise summaries of a legal judgment, "
+        "write a concise overall summary (3-4 sentences) focusing on the key legal findings and outcomes. "
+        "Avoid repeating the user's query or using introductory phrases. "
+        "Write in plain English for a non-lawyer:\n\n"
+        f"{combined_summary}"
     )
-    return await call_sambonva(prompt, max_tokens=256)
+    return await call_sambonva(final_prompt, max_tokens=256)
 
 
 async def summarize_case(text: str) -> str:
@@ -110,19 +194,11 @@ async def summarize_case(text: str) -> str:
         summary = await summarize_chunk(chunk)
         first_pass_summaries.append(summary)
 
-    combined_summary = "\n".join(first_pass_summaries)
-    final_prompt = (
-        "You are a legal assistant. Based on the following section-wise summaries of a legal judgment, "
-        "write a concise overall summary (3-4 sentences) focusing on the key legal findings and outcomes. "
-        "Avoid repeating the user's query or using introductory phrases. "
-        "Write in plain English for a non-lawyer:\n\n"
-        f"{combined_summary}"
-    )
-    return await call_sambonva(final_prompt, max_tokens=256)
+    return await combine_summaries(first_pass_summaries)
 
 
-async def hierarchical_relevance(query: str, text: str) -> str:
-    chunks = chunk_text(text)
+async def hierarchical_relevance(query: str, text: str, max_chars: int = MAX_TOKENS_PER_SUMMARY) -> str:
+    chunks = chunk_text(text, max_chars)
     relevant_reasons = []
 
     for chunk in chunks: